@@ -10,15 +10,16 @@ from datetime import datetime, timedelta
 import structlog
 
 from ...core.database import get_db
-from ...core.security import get_current_admin_user
+from ...core.security import get_current_admin_identity
 from ...core.permissions import Permission, PermissionManager
 from ...models.user import User, UserRole, UserStatus, RefreshToken
 from ...schemas.user import (
     UserResponse, UserAdminUpdate, UserListResponse, Message,
     UserStatsResponse, UserCreate
 )
-from ...services.auth_service import auth_service, AuthenticationError
+from ...services.auth_service import auth_service, AuthenticationError, UserIdentity
 from ...services.jwt_service import jwt_service
+from ...services.user_cache import user_cache
 
 logger = structlog.get_logger(__name__)
 router = APIRouter(prefix="/admin", tags=["Admin Management"])
@@ -35,7 +36,7 @@ async def admin_list_users_advanced(
     search: Optional[str] = Query(None, description="Search by email, name, or company"),
     sort_by: str = Query("created_at", description="Sort field"),
     sort_order: str = Query("desc", description="Sort order (asc/desc)"),
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> UserListResponse:
     """Advanced user listing with comprehensive filtering and sorting (admin only)."""
@@ -67,8 +68,8 @@ async def admin_list_users_advanced(
         else:
             query = query.order_by(sort_column)
     
-    # Get total count
-    total = query.count()
+    # Get total count (plain COUNT over the filters, without wrapping the sorted entity query)
+    total = query.order_by(None).with_entities(func.count(User.id)).scalar()
     
     # Apply pagination
     offset = (page - 1) * size
@@ -102,7 +103,7 @@ async def admin_list_users_advanced(
 async def admin_create_user(
     user_data: UserCreate,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> UserResponse:
     """Create new user as admin (admin only)."""
@@ -131,7 +132,7 @@ async def admin_create_user(
 async def admin_change_user_role(
     user_id: int,
     new_role: UserRole,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> UserResponse:
     """Change user role (admin only)."""
@@ -146,6 +147,7 @@ async def admin_change_user_role(
     user.role = new_role
     db.commit()
     db.refresh(user)
+    user_cache.invalidate_user(user_id)
     
     logger.info("👑 Admin role change", target_user_id=user_id, old_role=old_role.value, new_role=new_role.value)
     return UserResponse.from_orm(user)
@@ -155,7 +157,7 @@ async def admin_change_user_role(
 async def admin_change_user_status(
     user_id: int,
     new_status: UserStatus,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> UserResponse:
     """Change user status (admin only)."""
@@ -170,6 +172,7 @@ async def admin_change_user_status(
     user.is_active = new_status == UserStatus.ACTIVE
     db.commit()
     db.refresh(user)
+    user_cache.invalidate_user(user_id)
     
     logger.info("👑 Admin status change", target_user_id=user_id, new_status=new_status.value)
     return UserResponse.from_orm(user)
@@ -178,7 +181,7 @@ async def admin_change_user_status(
 @router.post("/users/{user_id}/verify", response_model=Message)
 async def admin_verify_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> Message:
     """Manually verify user email (admin only)."""
@@ -191,6 +194,7 @@ async def admin_verify_user(
     
     user.verify_email()
     db.commit()
+    user_cache.invalidate_user(user_id)
     
     logger.info(
         "👑 Admin user verification",
@@ -204,7 +208,7 @@ async def admin_verify_user(
 @router.post("/users/{user_id}/force-logout", response_model=Message)
 async def admin_force_logout_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> Message:
     """Force logout user from all sessions (admin only)."""
@@ -213,6 +217,7 @@ async def admin_force_logout_user(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     sessions_revoked = jwt_service.revoke_all_user_tokens(user_id, db)
+    user_cache.invalidate_user(user_id)
     
     logger.info("👑 Admin force logout", target_user_id=user_id, sessions_revoked=sessions_revoked)
     return Message(message=f"User logged out from {sessions_revoked} session(s)")
@@ -221,7 +226,7 @@ async def admin_force_logout_user(
 @router.get("/users/{user_id}/sessions", response_model=dict)
 async def admin_get_user_sessions(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> dict:
     """Get user's active sessions (admin only)."""
@@ -261,18 +266,23 @@ async def admin_get_user_sessions(
 
 @router.get("/stats/system", response_model=dict)
 async def admin_get_system_stats(
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> dict:
     """Get system statistics (admin only)."""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
+    # Role distribution and active counts in one grouped query
+    rows = db.query(
+        User.role,
+        func.count(User.id),
+        func.count(User.id).filter(User.is_active == True)
+    ).group_by(User.role).all()
     
-    # Role distribution
-    role_stats = {}
-    for role in UserRole:
-        count = db.query(User).filter(User.role == role).count()
+    role_stats = {role.value: 0 for role in UserRole}
+    total_users = active_users = 0
+    for role, count, active_count in rows:
         role_stats[role.value] = count
+        total_users += count
+        active_users += active_count
     
     logger.info("👑 Admin system stats requested", admin_id=current_user.id)
     
@@ -286,7 +296,7 @@ async def admin_get_system_stats(
 
 @router.post("/maintenance/cleanup-tokens", response_model=Message)
 async def admin_cleanup_expired_tokens(
-    current_user: User = Depends(get_current_admin_user),
+    current_user: UserIdentity = Depends(get_current_admin_identity),
     db: Session = Depends(get_db)
 ) -> Message:
     """Cleanup expired refresh tokens (admin only)."""
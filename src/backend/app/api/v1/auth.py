@@ -7,13 +7,13 @@ from sqlalchemy.orm import Session
 import structlog
 
 from ...core.database import get_db
-from ...core.security import get_current_user, optional_auth
+from ...core.security import get_current_user, get_current_user_identity, optional_auth
 from ...models.user import User
 from ...schemas.user import (
     UserCreate, UserLogin, UserLoginResponse, UserResponse,
     TokenRefresh, TokenResponse, Message
 )
-from ...services.auth_service import auth_service, AuthenticationError
+from ...services.auth_service import auth_service, AuthenticationError, UserIdentity
 
 logger = structlog.get_logger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -27,7 +27,7 @@ async def register_user(
 ) -> UserLoginResponse:
     """Register a new user account."""
     try:
-        user, tokens = auth_service.register_user(user_data, db)
+        user, tokens = await auth_service.register_user_async(user_data, db)
         
         logger.info("✅ User registration successful", user_id=user.id, email=user.email)
         
@@ -47,7 +47,7 @@ async def register_user(
 async def login_user(login_data: UserLogin, db: Session = Depends(get_db)) -> UserLoginResponse:
     """Authenticate user with email and password."""
     try:
-        user, tokens = auth_service.authenticate_user(login_data, db)
+        user, tokens = await auth_service.authenticate_user_async(login_data, db)
         
         logger.info("✅ User login successful", user_id=user.id)
         
@@ -77,7 +77,7 @@ async def refresh_tokens(token_data: TokenRefresh, db: Session = Depends(get_db)
 @router.post("/logout", response_model=Message)
 async def logout_user(
     token_data: TokenRefresh,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_user_identity),
     db: Session = Depends(get_db)
 ) -> Message:
     """Logout user by revoking refresh token."""
@@ -12,6 +12,7 @@ import aiofiles
 from datetime import datetime, timedelta
 import uuid
 import json
+from urllib.parse import quote
 
 from app.core.database import get_db
 from app.core.auth import verify_token, get_current_user
@@ -23,13 +24,21 @@ from app.schemas.proposal import (
     ProposalValidationResponse
 )
 from app.services.ai_service import AIService
-from app.services.proposal_service import ProposalService
+from app.services.proposal_service import ProposalService, export_filename
 from app.services.template_service import TemplateService
 
 router = APIRouter()
 security = HTTPBearer()
 
 
+def _attachment_disposition(filename: str) -> str:
+    """Build an attachment Content-Disposition header, quoted the same way as FileResponse."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 @router.post("/upload-transcript", response_model=TranscriptUploadResponse)
 async def upload_transcript(
     file: UploadFile = File(...),
@@ -201,17 +210,19 @@ async def list_proposals(
     limit: int = 100,
     phase: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[int] = None,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    List proposals with optional filtering.
+    List proposals with optional filtering, newest first.
     
     Args:
-        skip: Number of records to skip
+        skip: Number of records to skip (ignored when cursor is given)
         limit: Maximum number of records to return
         phase: Filter by project phase
         status: Filter by proposal status
+        cursor: ID of the last proposal on the previous page
         current_user: Authenticated user
         db: Database session
         
@@ -224,7 +235,8 @@ async def list_proposals(
         limit=limit,
         phase=phase,
         status=status,
-        user_role=current_user["role"]
+        user_role=current_user["role"],
+        cursor=cursor
     )
     
     return [
@@ -862,7 +874,7 @@ async def export_proposal(
             "markdown": "text/markdown"
         }
         
-        filename = f"{proposal.project_name}_{proposal.client_name}_proposal.{format}"
+        filename = export_filename(proposal, format)
         
         if format in ["pdf", "docx"]:
             # Return file response for binary formats
@@ -876,7 +888,7 @@ async def export_proposal(
             return Response(
                 content=export_content,
                 media_type=content_types[format],
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
+                headers={"Content-Disposition": _attachment_disposition(filename)}
             )
         
     except Exception as e:
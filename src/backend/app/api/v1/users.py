@@ -19,6 +19,7 @@ from ...schemas.user import (
 )
 from ...services.auth_service import auth_service, AuthenticationError
 from ...services.password_service import password_service
+from ...services.user_cache import user_cache
 
 logger = structlog.get_logger(__name__)
 router = APIRouter(prefix="/users", tags=["User Management"])
@@ -48,6 +49,7 @@ async def update_my_profile(
         
         db.commit()
         db.refresh(current_user)
+        user_cache.invalidate_user(current_user.id)
         
         logger.info("✅ Profile updated", user_id=current_user.id, fields=list(update_data.keys()))
         
@@ -67,7 +69,7 @@ async def change_my_password(
 ) -> Message:
     """Change current user's password."""
     try:
-        auth_service.change_password(
+        await auth_service.change_password_async(
             current_user.id,
             password_data.current_password,
             password_data.new_password,
@@ -121,6 +123,7 @@ async def update_user_by_id(
         
         db.commit()
         db.refresh(user)
+        user_cache.invalidate_user(user_id)
         
         logger.info("✅ User updated", user_id=user_id, updater_id=current_user.id)
         return UserResponse.from_orm(user)
@@ -157,8 +160,8 @@ async def list_users(
             (User.last_name.ilike(search_term))
         )
     
-    # Get total count
-    total = query.count()
+    # Get total count (plain COUNT over the filters, without wrapping the entity query)
+    total = query.with_entities(func.count(User.id)).scalar()
     
     # Apply pagination
     offset = (page - 1) * size
@@ -201,6 +204,7 @@ async def admin_update_user(
         
         db.commit()
         db.refresh(user)
+        user_cache.invalidate_user(user_id)
         
         logger.info("✅ Admin user update", user_id=user_id, admin_id=current_user.id)
         return UserResponse.from_orm(user)
@@ -228,6 +232,7 @@ async def deactivate_user(
     
     user.deactivate()
     db.commit()
+    user_cache.invalidate_user(user_id)
     
     logger.info("🔒 User deactivated", user_id=user_id, admin_id=current_user.id)
     return Message(message="User deactivated successfully")
@@ -247,6 +252,7 @@ async def activate_user(
     
     user.activate()
     db.commit()
+    user_cache.invalidate_user(user_id)
     
     logger.info("✅ User activated", user_id=user_id, admin_id=current_user.id)
     return Message(message="User activated successfully")
@@ -260,30 +266,30 @@ async def get_user_stats(
     """Get user statistics (admin only)."""
     from datetime import datetime, timedelta
     
-    # Get counts
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    inactive_users = db.query(User).filter(User.is_active == False).count()
-    pending_verification = db.query(User).filter(User.is_verified == False).count()
-    
-    # Role counts
-    admins = db.query(User).filter(User.role == UserRole.ADMIN).count()
-    project_managers = db.query(User).filter(User.role == UserRole.PROJECT_MANAGER).count()
-    clients = db.query(User).filter(User.role == UserRole.CLIENT).count()
-    
     # Recent registrations (last 30 days)
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_registrations = db.query(User).filter(User.created_at >= thirty_days_ago).count()
+    
+    # All counts in a single aggregate query
+    counts = db.query(
+        func.count(User.id).label("total_users"),
+        func.count(User.id).filter(User.is_active == True).label("active_users"),
+        func.count(User.id).filter(User.is_active == False).label("inactive_users"),
+        func.count(User.id).filter(User.is_verified == False).label("pending_verification"),
+        func.count(User.id).filter(User.role == UserRole.ADMIN).label("admins"),
+        func.count(User.id).filter(User.role == UserRole.PROJECT_MANAGER).label("project_managers"),
+        func.count(User.id).filter(User.role == UserRole.CLIENT).label("clients"),
+        func.count(User.id).filter(User.created_at >= thirty_days_ago).label("recent_registrations")
+    ).one()
     
     logger.info("📊 User stats requested", admin_id=current_user.id)
     
     return UserStatsResponse(
-        total_users=total_users,
-        active_users=active_users,
-        inactive_users=inactive_users,
-        pending_verification=pending_verification,
-        admins=admins,
-        project_managers=project_managers,
-        clients=clients,
-        recent_registrations=recent_registrations
+        total_users=counts.total_users,
+        active_users=counts.active_users,
+        inactive_users=counts.inactive_users,
+        pending_verification=counts.pending_verification,
+        admins=counts.admins,
+        project_managers=counts.project_managers,
+        clients=counts.clients,
+        recent_registrations=counts.recent_registrations
     ) 
\ No newline at end of file
@@ -34,12 +34,30 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, description="JWT access token expiration time")
     REFRESH_TOKEN_EXPIRE_MINUTES: int = Field(default=60 * 24 * 7, description="JWT refresh token expiration time")  # 7 days
     ALGORITHM: str = "HS256"
+    REFRESH_TOKEN_PEPPER: Optional[str] = Field(
+        default=None,
+        description="Key for refresh token digests (defaults to SECRET_KEY)"
+    )
+    AUTH_USER_CACHE_TTL_SECONDS: int = Field(default=60, description="Access token -> user cache TTL (0 disables)")
+    AUTH_USER_CACHE_MAXSIZE: int = Field(default=10_000, description="Maximum cached access tokens")
+    AUTH_TOKEN_DECODE_CACHE_TTL_SECONDS: int = Field(default=30, description="Verified access token payload cache TTL (0 disables)")
+    AUTH_TOKEN_DECODE_CACHE_MAXSIZE: int = Field(default=50_000, description="Maximum cached verified access tokens")
+    ARGON2_TIME_COST: int = Field(default=3, description="Argon2id iterations for password hashing")
+    ARGON2_MEMORY_COST: int = Field(default=46 * 1024, description="Argon2id memory cost in KiB")
+    ARGON2_PARALLELISM: int = Field(default=1, description="Argon2id parallel lanes")
     
     # Database Settings
     DATABASE_URL: str = Field(
         default="sqlite:///./test.db",
         description="Database connection URL"
     )
+    DB_POOL_SIZE: int = Field(default=20, description="Persistent connections kept in the pool")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Extra connections allowed above DB_POOL_SIZE")
+    DB_POOL_RECYCLE_SECONDS: int = Field(default=1800, description="Reconnect pooled connections older than this")
+    DB_POOL_PRE_PING: bool = Field(
+        default=True,
+        description="Test connections with a lightweight ping on checkout"
+    )
     
     # Redis Settings
     REDIS_URL: str = Field(
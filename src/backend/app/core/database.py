@@ -1,6 +1,9 @@
 """
 Database configuration and connection management for JDA AI Portal.
 """
+from typing import Any
+
+import orjson
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -12,12 +15,35 @@ from .config import get_settings
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Pool sizing and health checks apply to server databases; SQLite uses a single static connection.
+# pool_pre_ping costs one lightweight round trip per checkout; disable it and rely on
+# pool_recycle alone if that is too expensive.
+if "sqlite" in settings.DATABASE_URL:
+    engine_options = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False},
+    }
+else:
+    engine_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _json_serializer(value: Any) -> str:
+    """Serialize JSON column values with orjson."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.get_database_url(),
-    poolclass=StaticPool if "sqlite" in settings.DATABASE_URL else None,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
     echo=settings.is_development,  # Log SQL queries in development
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    **engine_options,
 )
 
 # Create session factory
@@ -39,7 +65,7 @@ async def create_tables():
         logger.info("🗄️ Creating database tables")
         
         # Import all models here to ensure they're registered
-        from app.models import user, project, client  # noqa: F401
+        from app.models import user, project, client, proposal  # noqa: F401
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
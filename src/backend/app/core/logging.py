@@ -2,10 +2,13 @@
 Logging configuration for JDA AI Portal Backend.
 Implements structured logging with correlation IDs and proper formatting.
 """
+import atexit
 import logging
 import logging.config
+import logging.handlers
+import queue
 import sys
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import structlog
 from structlog.types import EventDict
@@ -14,6 +17,9 @@ from .config import get_settings
 
 settings = get_settings()
 
+# Background listener that performs the actual stdout writes
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
 
 def add_correlation_id(logger: Any, method_name: str, event_dict: EventDict) -> EventDict:
     """
@@ -59,11 +65,24 @@ def setup_logging() -> None:
     """
     Setup structured logging configuration.
     """
-    # Configure standard library logging
+    global _queue_listener
+    
+    # Configure standard library logging; request threads only enqueue records,
+    # a background listener thread does the formatting and stream I/O
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+    _queue_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _queue_listener.start()
+    
     logging.basicConfig(
         format="%(message)s",
-        stream=sys.stdout,
+        handlers=[logging.handlers.QueueHandler(log_queue)],
         level=getattr(logging, settings.LOG_LEVEL.upper()),
+        force=True,
     )
     
     # Configure structlog
@@ -105,6 +124,20 @@ def setup_logging() -> None:
         logging.getLogger("asyncio").setLevel(logging.WARNING)
 
 
+def stop_logging() -> None:
+    """
+    Flush queued log records and stop the background listener.
+    """
+    global _queue_listener
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(stop_logging)
+
+
 class LoggerMixin:
     """
     Mixin class to add structured logging to any class.
@@ -2,7 +2,7 @@
 Security dependencies for FastAPI route protection.
 Provides JWT authentication and role-based access control.
 """
-from typing import Optional, Annotated
+from typing import Callable, Optional, Annotated, TypeVar
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -10,7 +10,7 @@ import structlog
 
 from .database import get_db
 from ..models.user import User, UserRole
-from ..services.auth_service import auth_service
+from ..services.auth_service import auth_service, UserIdentity
 from ..services.jwt_service import jwt_service
 
 logger = structlog.get_logger(__name__)
@@ -19,19 +19,23 @@ logger = structlog.get_logger(__name__)
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(security)],
-    db: Session = Depends(get_db)
-) -> User:
+_Principal = TypeVar("_Principal", User, UserIdentity)
+
+
+def _authenticate(
+    credentials: Optional[HTTPAuthorizationCredentials],
+    loader: Callable[[str], Optional[_Principal]]
+) -> _Principal:
     """
-    Get current authenticated user from JWT token.
+    Resolve the authenticated principal for a request.
+    Shared by the full-user and identity-only dependencies.
     
     Args:
         credentials: HTTP authorization credentials
-        db: Database session
+        loader: Looks up the principal for an access token, None if invalid
         
     Returns:
-        Current user object
+        Authenticated, active principal
         
     Raises:
         HTTPException: If authentication fails
@@ -45,10 +49,9 @@ async def get_current_user(
         )
     
     try:
-        # Get user from token
-        user = auth_service.get_current_user(credentials.credentials, db)
+        principal = loader(credentials.credentials)
         
-        if not user:
+        if not principal:
             logger.warning("Authentication failed: invalid token")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,14 +59,14 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        if not user.is_active:
-            logger.warning("Authentication failed: user inactive", user_id=user.id)
+        if not principal.is_active:
+            logger.warning("Authentication failed: user inactive", user_id=principal.id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Inactive user account",
             )
         
-        return user
+        return principal
         
     except HTTPException:
         raise
@@ -76,6 +79,74 @@ async def get_current_user(
         )
 
 
+def _require_admin(principal: _Principal) -> _Principal:
+    """
+    Check that an authenticated principal has the admin role.
+    
+    Args:
+        principal: Current user or user identity
+        
+    Returns:
+        The principal, unchanged
+        
+    Raises:
+        HTTPException: If the principal doesn't have admin role
+    """
+    if principal.role != UserRole.ADMIN:
+        logger.warning(
+            "Authorization failed: admin required",
+            user_id=principal.id,
+            user_role=principal.role.value
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    return principal
+
+
+async def get_current_user(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(security)],
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get current authenticated user from JWT token.
+    
+    Args:
+        credentials: HTTP authorization credentials
+        db: Database session
+        
+    Returns:
+        Current user object
+        
+    Raises:
+        HTTPException: If authentication fails
+    """
+    return _authenticate(credentials, lambda token: auth_service.get_current_user(token, db))
+
+
+async def get_current_user_identity(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(security)],
+    db: Session = Depends(get_db)
+) -> UserIdentity:
+    """
+    Get current user's id, role and active flag from JWT token.
+    For endpoints that only gate on identity and don't need the full User.
+    
+    Args:
+        credentials: HTTP authorization credentials
+        db: Database session
+        
+    Returns:
+        Current user identity
+        
+    Raises:
+        HTTPException: If authentication fails
+    """
+    return _authenticate(credentials, lambda token: auth_service.get_current_user_identity(token, db))
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -106,18 +177,25 @@ async def get_current_admin_user(
     Raises:
         HTTPException: If user doesn't have admin role
     """
-    if not current_user.is_admin:
-        logger.warning(
-            "Authorization failed: admin required",
-            user_id=current_user.id,
-            user_role=current_user.role.value
-        )
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required"
-        )
+    return _require_admin(current_user)
+
+
+async def get_current_admin_identity(
+    current_user: UserIdentity = Depends(get_current_user_identity)
+) -> UserIdentity:
+    """
+    Get current user identity with admin role.
     
-    return current_user
+    Args:
+        current_user: Current user identity from get_current_user_identity
+        
+    Returns:
+        Current admin user identity
+        
+    Raises:
+        HTTPException: If user doesn't have admin role
+    """
+    return _require_admin(current_user)
 
 
 async def get_current_manager_or_admin(
@@ -266,6 +344,8 @@ CurrentUser = Annotated[User, Depends(get_current_user)]
 CurrentActiveUser = Annotated[User, Depends(get_current_active_user)]
 CurrentAdminUser = Annotated[User, Depends(get_current_admin_user)]
 CurrentManagerOrAdmin = Annotated[User, Depends(get_current_manager_or_admin)]
+CurrentUserIdentity = Annotated[UserIdentity, Depends(get_current_user_identity)]
+CurrentAdminIdentity = Annotated[UserIdentity, Depends(get_current_admin_identity)]
 OptionalUser = Annotated[Optional[User], Depends(optional_auth)]
 
 # Role-based dependencies
@@ -3,13 +3,13 @@ Proposal database models.
 Handles proposal, version control, and project phase tracking.
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
-Base = declarative_base()
+from ..core.database import Base
 
 
 class ProjectPhaseEnum(enum.Enum):
@@ -51,6 +51,10 @@ class Proposal(Base):
     # File references
     transcript_path = Column(String(500), nullable=True)  # Path to uploaded transcript
     
+    # Validation results and activity history (exports, duplications).
+    # Mapped as proposal_metadata since "metadata" is reserved on declarative classes.
+    proposal_metadata = Column("metadata", JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    
     # Metadata
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -58,6 +62,7 @@ class Proposal(Base):
     
     # Relationships
     versions = relationship("ProposalVersion", back_populates="proposal", cascade="all, delete-orphan")
+    shares = relationship("ProposalShare", back_populates="proposal", cascade="all, delete-orphan")
     creator = relationship("User", back_populates="proposals")
     
     def __repr__(self) -> str:
@@ -134,6 +139,38 @@ class ProjectTracker(Base):
         return f"<ProjectTracker(id={self.id}, project='{self.project_name}', phase='{self.current_phase}')>"
 
 
+class ProposalShare(Base):
+    """
+    Proposal share link model.
+    One row per shareable link, looked up by its unique token.
+    """
+    __tablename__ = "proposal_shares"
+
+    id = Column(Integer, primary_key=True, index=True)
+    proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False, index=True)
+    token = Column(String(64), nullable=False, unique=True, index=True)
+    
+    # Share settings
+    share_type = Column(String(50), nullable=False)  # client_view, public_link, team_access
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    password_protected = Column(Boolean, default=False)
+    
+    # Usage tracking
+    access_count = Column(Integer, nullable=False, default=0)
+    
+    # Metadata
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    proposal = relationship("Proposal", back_populates="shares")
+    creator = relationship("User")
+    
+    def __repr__(self) -> str:
+        """String representation of proposal share."""
+        return f"<ProposalShare(id={self.id}, proposal_id={self.proposal_id}, type='{self.share_type}')>"
+
+
 class ProposalTemplate(Base):
     """
     Proposal template model.
@@ -4,7 +4,7 @@ Implements comprehensive user management with roles and relationships.
 """
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -34,7 +34,7 @@ class User(Base):
     Attributes:
         id: Primary key identifier
         email: Unique email address for login
-        hashed_password: Bcrypt hashed password
+        hashed_password: Argon2id (or legacy bcrypt) password hash
         first_name: User's first name
         last_name: User's last name
         role: User role for RBAC (admin, project_manager, client)
@@ -82,6 +82,7 @@ class User(Base):
     
     # Relationships
     proposals = relationship("Proposal", back_populates="creator")
+    refresh_tokens = relationship("RefreshToken", back_populates="user")
     # projects = relationship("Project", secondary="project_users", back_populates="members")
     # created_projects = relationship("Project", back_populates="created_by")
     # client_profile = relationship("Client", back_populates="user", uselist=False)
@@ -149,20 +150,31 @@ class User(Base):
 class RefreshToken(Base):
     """
     Refresh token model for JWT token management.
-    Stores refresh tokens for secure token renewal.
+    Stores a keyed digest of each refresh token; the raw token only ever
+    exists on the client.
     """
     
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Backs the per-user "active tokens" lookups and bulk revocation; partial where
+        # supported so revoked rows, which only accumulate, stay out of the index
+        Index(
+            "ix_refresh_tokens_user_id_is_revoked", "user_id", "is_revoked",
+            postgresql_where=text("is_revoked = false"),
+            sqlite_where=text("is_revoked = 0")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(500), unique=True, index=True, nullable=False)
+    token_hash = Column(LargeBinary(32), unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     is_revoked = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    # Relationship
-    user = relationship("User", backref="refresh_tokens")
+    # Relationship; the owner is needed whenever a token is redeemed, so it is
+    # loaded in the same query (many-to-one, so the join adds at most one row)
+    user = relationship("User", back_populates="refresh_tokens", lazy="joined")
     
     def __repr__(self) -> str:
         """String representation of RefreshToken."""
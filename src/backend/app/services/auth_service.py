@@ -2,26 +2,46 @@
 Authentication service for user registration, login, and authentication management.
 Combines JWT and password services for comprehensive authentication functionality.
 """
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, NoReturn, NamedTuple
 from datetime import datetime
+import hmac
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 import structlog
 
 from ..models.user import User, UserRole, UserStatus
 from ..schemas.user import UserCreate, UserLogin, UserResponse, UserLoginResponse
-from .jwt_service import jwt_service
+from .jwt_service import jwt_service, TOKEN_TYPE_BEARER
 from .password_service import password_service
+from .user_cache import user_cache, UserSnapshot
 from ..core.database import get_db
 
 logger = structlog.get_logger(__name__)
 
+# Verified against when no usable account exists so every login runs the KDF;
+# hashed once at import with the same parameters as real hashes
+_DUMMY_HASH = password_service.hash_password("!invalid-sentinel!")
+
+# Role hierarchy for permission checks (higher level includes lower levels)
+_ROLE_LEVELS = {
+    UserRole.CLIENT: 1,
+    UserRole.PROJECT_MANAGER: 2,
+    UserRole.ADMIN: 3
+}
+
 
 class AuthenticationError(Exception):
     """Custom exception for authentication errors."""
     pass
 
 
+class UserIdentity(NamedTuple):
+    """Minimal identity of an authenticated user for role/permission gating."""
+    id: int
+    role: UserRole
+    is_active: bool
+
+
 class AuthService:
     """
     Service for handling user authentication operations.
@@ -47,61 +67,32 @@ class AuthService:
             AuthenticationError: If registration fails
         """
         try:
-            # Check if user already exists
-            existing_user = db.query(User).filter(User.email == user_data.email).first()
-            if existing_user:
-                logger.warning("Registration failed: email already exists", email=user_data.email)
-                raise AuthenticationError("Email already registered")
-            
-            # Validate password strength
-            is_strong, issues = self.password_service.is_password_strong(user_data.password)
-            if not is_strong:
-                logger.warning("Registration failed: weak password", issues=issues)
-                raise AuthenticationError(f"Password requirements not met: {', '.join(issues)}")
-            
-            # Hash password
+            self._validate_registration(user_data, db)
             hashed_password = self.password_service.hash_password(user_data.password)
+            return self._create_registered_user(user_data, hashed_password, db)
+        except Exception as e:
+            self._handle_registration_error(e, db)
+    
+    async def register_user_async(self, user_data: UserCreate, db: Session) -> Tuple[User, Dict[str, str]]:
+        """
+        Register a new user, hashing the password on the hash thread pool.
+        
+        Args:
+            user_data: User registration data
+            db: Database session
             
-            # Create user
-            db_user = User(
-                email=user_data.email,
-                hashed_password=hashed_password,
-                first_name=user_data.first_name,
-                last_name=user_data.last_name,
-                phone_number=user_data.phone_number,
-                company=user_data.company,
-                bio=user_data.bio,
-                timezone=user_data.timezone,
-                role=user_data.role,
-                status=UserStatus.ACTIVE,
-                is_active=True,
-                is_verified=False  # Will be verified later via email
-            )
-            
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-            
-            # Generate authentication tokens
-            tokens = self._generate_user_tokens(db_user, db)
-            
-            logger.info(
-                "✅ User registered successfully",
-                user_id=db_user.id,
-                email=db_user.email,
-                role=db_user.role.value
-            )
-            
-            return db_user, tokens
+        Returns:
+            Tuple of (User object, tokens dictionary)
             
-        except IntegrityError as e:
-            db.rollback()
-            logger.error("Database integrity error during registration", error=str(e))
-            raise AuthenticationError("Registration failed due to data conflict")
+        Raises:
+            AuthenticationError: If registration fails
+        """
+        try:
+            self._validate_registration(user_data, db)
+            hashed_password = await self.password_service.hash_password_async(user_data.password)
+            return self._create_registered_user(user_data, hashed_password, db)
         except Exception as e:
-            db.rollback()
-            logger.error("Unexpected error during registration", error=str(e))
-            raise AuthenticationError(f"Registration failed: {str(e)}")
+            self._handle_registration_error(e, db)
     
     def authenticate_user(self, login_data: UserLogin, db: Session) -> Tuple[User, Dict[str, str]]:
         """
@@ -117,42 +108,45 @@ class AuthService:
         Raises:
             AuthenticationError: If authentication fails
         """
-        # Get user by email
-        user = db.query(User).filter(User.email == login_data.email).first()
-        if not user:
-            logger.warning("Authentication failed: user not found", email=login_data.email)
-            raise AuthenticationError("Invalid email or password")
-        
-        # Check if user is active
-        if not user.is_active:
-            logger.warning("Authentication failed: user inactive", user_id=user.id)
-            raise AuthenticationError("Account is inactive")
+        user = self._get_login_user(login_data, db)
         
-        # Check user status
-        if user.status == UserStatus.SUSPENDED:
-            logger.warning("Authentication failed: user suspended", user_id=user.id)
-            raise AuthenticationError("Account is suspended")
+        # Verify password (against a dummy hash for unknown users to keep timing uniform)
+        is_valid = self.password_service.verify_password(login_data.password, self._login_hash(user))
+        self._check_login(user, is_valid, login_data)
         
-        # Verify password
-        if not self.password_service.verify_password(login_data.password, user.hashed_password):
-            logger.warning("Authentication failed: invalid password", user_id=user.id)
-            raise AuthenticationError("Invalid email or password")
+        # Upgrade legacy/outdated hashes while the plaintext is available
+        if self.password_service.needs_rehash(user.hashed_password):
+            user.hashed_password = self.password_service.hash_password(login_data.password)
         
-        # Update last login
-        user.update_last_login()
-        db.commit()
+        return self._complete_login(user, db)
+    
+    async def authenticate_user_async(self, login_data: UserLogin, db: Session) -> Tuple[User, Dict[str, str]]:
+        """
+        Authenticate user, verifying the password on the hash thread pool.
         
-        # Generate authentication tokens
-        tokens = self._generate_user_tokens(user, db)
+        Args:
+            login_data: User login credentials
+            db: Database session
+            
+        Returns:
+            Tuple of (User object, tokens dictionary)
+            
+        Raises:
+            AuthenticationError: If authentication fails
+        """
+        user = self._get_login_user(login_data, db)
         
-        logger.info(
-            "✅ User authenticated successfully",
-            user_id=user.id,
-            email=user.email,
-            role=user.role.value
+        # Verify password (against a dummy hash for unknown users to keep timing uniform)
+        is_valid = await self.password_service.verify_password_async(
+            login_data.password, self._login_hash(user)
         )
+        self._check_login(user, is_valid, login_data)
         
-        return user, tokens
+        # Upgrade legacy/outdated hashes while the plaintext is available
+        if self.password_service.needs_rehash(user.hashed_password):
+            user.hashed_password = await self.password_service.hash_password_async(login_data.password)
+        
+        return self._complete_login(user, db)
     
     def refresh_user_tokens(self, refresh_token: str, db: Session) -> Optional[Dict[str, str]]:
         """
@@ -194,18 +188,20 @@ class AuthService:
         
         return success
     
-    def logout_all_sessions(self, user_id: int, db: Session) -> int:
+    def logout_all_sessions(self, user_id: int, db: Session, commit: bool = True) -> int:
         """
         Logout user from all sessions by revoking all refresh tokens.
         
         Args:
             user_id: User ID
             db: Database session
+            commit: Whether to commit; pass False to join the caller's transaction
             
         Returns:
             Number of tokens revoked
         """
-        count = self.jwt_service.revoke_all_user_tokens(user_id, db)
+        count = self.jwt_service.revoke_all_user_tokens(user_id, db, commit=commit)
+        user_cache.invalidate_user(user_id)
         
         logger.info(
             "✅ All user sessions logged out",
@@ -218,6 +214,8 @@ class AuthService:
     def get_current_user(self, token: str, db: Session) -> Optional[User]:
         """
         Get current user from access token.
+        Cached per token; on a cache hit the user's access state is re-read and
+        the user is rebuilt from its snapshot and attached to the session.
         
         Args:
             token: JWT access token
@@ -226,17 +224,85 @@ class AuthService:
         Returns:
             User object or None if invalid
         """
-        user_id = self.jwt_service.get_user_id_from_token(token)
-        if not user_id:
+        # Fast path: token already verified and user snapshot still current
+        snapshot = self._current_snapshot(token, db)
+        if snapshot is not None:
+            return db.merge(snapshot.to_user(), load=False)
+        
+        payload = self.jwt_service.verify_token(token)
+        if not payload:
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
+        try:
+            user_id = int(payload.get("sub"))
+        except (ValueError, TypeError):
+            logger.warning("Invalid user ID in token", sub=payload.get("sub"))
+            return None
+        
+        user = db.get(User, user_id)
         if not user or not user.is_active:
             logger.warning("Current user lookup failed", user_id=user_id)
             return None
         
+        user_cache.set(token, UserSnapshot.from_user(user), expires_at=payload.get("exp"))
+        
         return user
     
+    def _current_snapshot(self, token: str, db: Session) -> Optional[UserSnapshot]:
+        """
+        Get the cached snapshot for a token if the user's access state is unchanged.
+        
+        The cache is per process and only invalidated by the endpoints that
+        change users here, so role, status and the active flag are re-read on
+        every hit; a changed or deleted user drops all of the user's entries.
+        
+        Args:
+            token: JWT access token
+            db: Database session
+            
+        Returns:
+            UserSnapshot or None on a miss or a stale entry
+        """
+        snapshot = user_cache.get(token)
+        if snapshot is None:
+            return None
+        
+        row = db.query(User.role, User.status, User.is_active).filter(User.id == snapshot.id).first()
+        if row is not None and (row.role, row.status, row.is_active) == (
+            snapshot.role, snapshot.state.get("status"), snapshot.is_active
+        ):
+            return snapshot
+        
+        user_cache.invalidate_user(snapshot.id)
+        return None
+    
+    def get_current_user_identity(self, token: str, db: Session) -> Optional[UserIdentity]:
+        """
+        Get the id, role and active flag of the current user from an access token.
+        Selects only those columns instead of hydrating a full User object.
+        
+        Args:
+            token: JWT access token
+            db: Database session
+            
+        Returns:
+            UserIdentity or None if invalid
+        """
+        snapshot = self._current_snapshot(token, db)
+        if snapshot is not None:
+            return UserIdentity(snapshot.id, snapshot.role, snapshot.is_active)
+        
+        user_id = self.jwt_service.get_user_id_from_token(token)
+        if not user_id:
+            return None
+        
+        row = db.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+        if not row or not row.is_active:
+            logger.warning("Current user lookup failed", user_id=user_id)
+            return None
+        
+        return UserIdentity(row.id, row.role, row.is_active)
+    
     def change_password(self, user_id: int, current_password: str, new_password: str, db: Session) -> bool:
         """
         Change user password with validation.
@@ -253,13 +319,108 @@ class AuthService:
         Raises:
             AuthenticationError: If password change fails
         """
-        # Get user
-        user = db.query(User).filter(User.id == user_id).first()
+        user = self._get_password_change_user(user_id, db)
+        is_valid = self.password_service.verify_password(current_password, user.hashed_password)
+        self._check_password_change(user_id, is_valid, current_password, new_password)
+        
+        hashed_password = self.password_service.hash_password(new_password)
+        return self._store_new_password(user, hashed_password, db)
+    
+    async def change_password_async(
+        self,
+        user_id: int,
+        current_password: str,
+        new_password: str,
+        db: Session
+    ) -> bool:
+        """
+        Change user password, running the KDF on the hash thread pool.
+        
+        Args:
+            user_id: User ID
+            current_password: Current password for verification
+            new_password: New password
+            db: Database session
+            
+        Returns:
+            True if password changed successfully
+            
+        Raises:
+            AuthenticationError: If password change fails
+        """
+        user = self._get_password_change_user(user_id, db)
+        is_valid = await self.password_service.verify_password_async(current_password, user.hashed_password)
+        self._check_password_change(user_id, is_valid, current_password, new_password)
+        
+        hashed_password = await self.password_service.hash_password_async(new_password)
+        return self._store_new_password(user, hashed_password, db)
+    
+    def verify_user_permissions(self, user: User, required_role: UserRole) -> bool:
+        """
+        Verify if user has required role permissions.
+        
+        Args:
+            user: User object
+            required_role: Required role level
+            
+        Returns:
+            True if user has sufficient permissions
+        """
+        # Admins and exact role matches pass without consulting the hierarchy
+        if user.role is UserRole.ADMIN or user.role is required_role:
+            return True
+        
+        has_permission = _ROLE_LEVELS.get(user.role, 0) >= _ROLE_LEVELS.get(required_role, 999)
+        
+        if not has_permission:
+            logger.warning(
+                "Permission denied",
+                user_id=user.id,
+                user_role=user.role.value,
+                required_role=required_role.value
+            )
+        
+        return has_permission
+    
+    def _get_password_change_user(self, user_id: int, db: Session) -> User:
+        """
+        Load the user whose password is being changed.
+        
+        Args:
+            user_id: User ID
+            db: Database session
+            
+        Returns:
+            User object
+            
+        Raises:
+            AuthenticationError: If the user does not exist
+        """
+        user = db.get(User, user_id)
         if not user:
             raise AuthenticationError("User not found")
+        return user
+    
+    def _check_password_change(
+        self,
+        user_id: int,
+        is_valid: bool,
+        current_password: str,
+        new_password: str
+    ) -> None:
+        """
+        Check that a password change can proceed once the current password was verified.
         
-        # Verify current password
-        if not self.password_service.verify_password(current_password, user.hashed_password):
+        Args:
+            user_id: User ID
+            is_valid: Whether the current password matched
+            current_password: Current password
+            new_password: New password
+            
+        Raises:
+            AuthenticationError: If the change must be rejected
+        """
+        if not is_valid:
             logger.warning("Password change failed: invalid current password", user_id=user_id)
             raise AuthenticationError("Current password is incorrect")
         
@@ -269,84 +430,227 @@ class AuthService:
             logger.warning("Password change failed: weak new password", user_id=user_id, issues=issues)
             raise AuthenticationError(f"New password requirements not met: {', '.join(issues)}")
         
-        # Check if new password is different from current
-        if self.password_service.verify_password(new_password, user.hashed_password):
+        # Check if new password is different from current (current_password was
+        # just verified, so a constant-time plaintext compare avoids a second KDF run)
+        if hmac.compare_digest(current_password.encode("utf-8"), new_password.encode("utf-8")):
             logger.warning("Password change failed: same as current", user_id=user_id)
             raise AuthenticationError("New password must be different from current password")
+    
+    def _store_new_password(self, user: User, hashed_password: str, db: Session) -> bool:
+        """
+        Persist a new password hash and revoke existing sessions.
         
-        # Hash new password
-        hashed_password = self.password_service.hash_password(new_password)
-        
-        # Update password
+        Args:
+            user: User object
+            hashed_password: Already-hashed new password
+            db: Database session
+            
+        Returns:
+            True
+        """
+        # Update password and revoke all existing tokens to force re-authentication,
+        # committed together in one transaction
+        user_id = user.id
         user.hashed_password = hashed_password
+        self.logout_all_sessions(user_id, db, commit=False)
         db.commit()
         
-        # Revoke all existing tokens to force re-authentication
-        self.logout_all_sessions(user_id, db)
-        
         logger.info("✅ Password changed successfully", user_id=user_id)
         
         return True
     
-    def verify_user_permissions(self, user: User, required_role: UserRole) -> bool:
+    def _validate_registration(self, user_data: UserCreate, db: Session) -> None:
         """
-        Verify if user has required role permissions.
+        Check that a registration request can proceed.
         
         Args:
-            user: User object
-            required_role: Required role level
+            user_data: User registration data
+            db: Database session
+            
+        Raises:
+            AuthenticationError: If the password is weak
+        """
+        # Duplicate emails are rejected by the unique constraint on insert
+        # Validate password strength
+        is_strong, issues = self.password_service.is_password_strong(user_data.password)
+        if not is_strong:
+            logger.warning("Registration failed: weak password", issues=issues)
+            raise AuthenticationError(f"Password requirements not met: {', '.join(issues)}")
+    
+    def _create_registered_user(
+        self,
+        user_data: UserCreate,
+        hashed_password: str,
+        db: Session
+    ) -> Tuple[User, Dict[str, str]]:
+        """
+        Persist a new user and issue authentication tokens.
+        
+        Args:
+            user_data: User registration data
+            hashed_password: Already-hashed password
+            db: Database session
             
         Returns:
-            True if user has sufficient permissions
+            Tuple of (User object, tokens dictionary)
         """
-        role_hierarchy = {
-            UserRole.CLIENT: 1,
-            UserRole.PROJECT_MANAGER: 2,
-            UserRole.ADMIN: 3
-        }
+        # Create user
+        db_user = User(
+            email=user_data.email,
+            hashed_password=hashed_password,
+            first_name=user_data.first_name,
+            last_name=user_data.last_name,
+            phone_number=user_data.phone_number,
+            company=user_data.company,
+            bio=user_data.bio,
+            timezone=user_data.timezone,
+            role=user_data.role,
+            status=UserStatus.ACTIVE,
+            is_active=True,
+            is_verified=False  # Will be verified later via email
+        )
         
-        user_level = role_hierarchy.get(user.role, 0)
-        required_level = role_hierarchy.get(required_role, 999)
+        # User row and refresh token share one transaction; flush only to get the ID
+        # so a failure while issuing tokens rolls back the user as well
+        db.add(db_user)
+        db.flush()
         
-        has_permission = user_level >= required_level
+        # Generate authentication tokens
+        tokens = self._generate_user_tokens(db_user, db, commit=False)
+        db.commit()
         
-        if not has_permission:
-            logger.warning(
-                "Permission denied",
-                user_id=user.id,
-                user_role=user.role.value,
-                required_role=required_role.value
-            )
+        logger.info(
+            "✅ User registered successfully",
+            user_id=db_user.id,
+            email=db_user.email,
+            role=db_user.role.value
+        )
         
-        return has_permission
+        return db_user, tokens
+    
+    def _handle_registration_error(self, error: Exception, db: Session) -> NoReturn:
+        """
+        Roll back a failed registration and raise AuthenticationError.
+        
+        Args:
+            error: Exception raised during registration
+            db: Database session
+            
+        Raises:
+            AuthenticationError: Always
+        """
+        db.rollback()
+        if isinstance(error, IntegrityError):
+            # users.email is the only unique column a new registration can collide on
+            logger.warning("Registration failed: email already exists", error=str(error.orig))
+            raise AuthenticationError("Email already registered")
+        logger.error("Unexpected error during registration", error=str(error))
+        raise AuthenticationError(f"Registration failed: {str(error)}")
+    
+    def _get_login_user(self, login_data: UserLogin, db: Session) -> Optional[User]:
+        """
+        Look up a user for login by email.
+        
+        Args:
+            login_data: User login credentials
+            db: Database session
+            
+        Returns:
+            User object or None if not found
+        """
+        return db.query(User).filter(User.email == login_data.email).one_or_none()
+    
+    def _login_hash(self, user: Optional[User]) -> str:
+        """
+        Get the hash a login attempt is verified against.
+        
+        Args:
+            user: User object or None
+            
+        Returns:
+            User's password hash, or the dummy hash if there is no user
+        """
+        return user.hashed_password if user else _DUMMY_HASH
+    
+    def _check_login(self, user: Optional[User], is_valid: bool, login_data: UserLogin) -> None:
+        """
+        Check the outcome of a login attempt after the password was verified.
+        Account status is only reported once the password is known to match.
+        
+        Args:
+            user: User object or None
+            is_valid: Whether the password matched
+            login_data: User login credentials
+            
+        Raises:
+            AuthenticationError: If the login must be rejected
+        """
+        if not user:
+            logger.warning("Authentication failed: user not found", email=login_data.email)
+            raise AuthenticationError("Invalid email or password")
+        
+        if not is_valid:
+            logger.warning("Authentication failed: invalid password", user_id=user.id)
+            raise AuthenticationError("Invalid email or password")
+        
+        # Check if user is active
+        if not user.is_active:
+            logger.warning("Authentication failed: user inactive", user_id=user.id)
+            raise AuthenticationError("Account is inactive")
+        
+        # Check user status
+        if user.status == UserStatus.SUSPENDED:
+            logger.warning("Authentication failed: user suspended", user_id=user.id)
+            raise AuthenticationError("Account is suspended")
+    
+    def _complete_login(self, user: User, db: Session) -> Tuple[User, Dict[str, str]]:
+        """
+        Record a successful login (including any pending password rehash)
+        and issue authentication tokens.
+        
+        Args:
+            user: Authenticated user
+            db: Database session
+            
+        Returns:
+            Tuple of (User object, tokens dictionary)
+        """
+        # Update last login and store the new refresh token in a single commit
+        user.update_last_login()
+        tokens = self._generate_user_tokens(user, db, commit=False)
+        db.commit()
+        
+        logger.info(
+            "✅ User authenticated successfully",
+            user_id=user.id,
+            email=user.email,
+            role=user.role.value
+        )
+        
+        return user, tokens
     
-    def _generate_user_tokens(self, user: User, db: Session) -> Dict[str, str]:
+    def _generate_user_tokens(self, user: User, db: Session, commit: bool = True) -> Dict[str, str]:
         """
         Generate JWT tokens for authenticated user.
         
         Args:
             user: User object
             db: Database session
+            commit: Whether the refresh token insert commits on its own
             
         Returns:
             Dictionary with access and refresh tokens
         """
-        # Create access token data
-        access_token_data = {
-            "sub": str(user.id),
-            "email": user.email,
-            "role": user.role.value,
-            "full_name": user.full_name
-        }
-        
         # Generate tokens
-        access_token = self.jwt_service.create_access_token(access_token_data)
-        refresh_token = self.jwt_service.create_refresh_token(user.id, db)
+        access_token = self.jwt_service.create_access_token(
+            self.jwt_service.build_access_token_claims(user)
+        )
+        refresh_token = self.jwt_service.create_refresh_token(user.id, db, commit=commit)
         
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
-            "token_type": "bearer"
+            "token_type": TOKEN_TYPE_BEARER
         }
 
 
@@ -3,9 +3,14 @@ JWT service for token generation, validation, and refresh.
 Handles all JWT-related operations for authentication.
 """
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from hashlib import blake2b, sha256
+from threading import Lock
+from typing import Optional, Dict, Any, Set, Tuple
 import secrets
-from jose import JWTError, jwt
+import time
+from cachetools import TTLCache
+from jose import JWTError, jwk, jwt
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 import structlog
 
@@ -16,6 +21,8 @@ from ..models.user import User, RefreshToken
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+TOKEN_TYPE_BEARER = "bearer"
+
 
 class JWTService:
     """
@@ -28,6 +35,39 @@ class JWTService:
         self.algorithm = settings.ALGORITHM
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_minutes = settings.REFRESH_TOKEN_EXPIRE_MINUTES
+        # Signing key object and algorithm list built once instead of on every encode/decode
+        self._signing_key = jwk.construct(self.secret_key, self.algorithm)
+        self._algorithms = [self.algorithm]
+        # blake2b keys are limited to 64 bytes, so derive a fixed-size key from the pepper
+        self._refresh_token_key = sha256(
+            (settings.REFRESH_TOKEN_PEPPER or self.secret_key).encode("utf-8")
+        ).digest()
+        
+        # Successful access token decodes: token digest -> (exp, payload)
+        self._verify_cache_enabled = settings.AUTH_TOKEN_DECODE_CACHE_TTL_SECONDS > 0
+        self._verify_cache: TTLCache = TTLCache(
+            maxsize=max(settings.AUTH_TOKEN_DECODE_CACHE_MAXSIZE, 1),
+            ttl=max(settings.AUTH_TOKEN_DECODE_CACHE_TTL_SECONDS, 1)
+        )
+        self._verify_index: Dict[int, Set[bytes]] = {}
+        self._verify_lock = Lock()
+    
+    def build_access_token_claims(self, user: User) -> Dict[str, Any]:
+        """
+        Build the access token claims for a user.
+        
+        Args:
+            user: User the token is issued for
+            
+        Returns:
+            Claims dictionary for create_access_token
+        """
+        return {
+            "sub": str(user.id),
+            "email": user.email,
+            "role": user.role,
+            "full_name": f"{user.first_name} {user.last_name}".strip()
+        }
     
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """
@@ -42,18 +82,16 @@ class JWTService:
         """
         to_encode = data.copy()
         
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
+        now = datetime.utcnow()
+        expire = now + (expires_delta or timedelta(minutes=self.access_token_expire_minutes))
         
         to_encode.update({
             "exp": expire,
-            "iat": datetime.utcnow(),
+            "iat": now,
             "type": "access"
         })
         
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        encoded_jwt = jwt.encode(to_encode, self._signing_key, algorithm=self.algorithm)
         
         logger.info(
             "🔑 Access token created",
@@ -64,38 +102,54 @@ class JWTService:
         
         return encoded_jwt
     
-    def create_refresh_token(self, user_id: int, db: Session) -> str:
+    def hash_refresh_token(self, token: str) -> bytes:
+        """
+        Compute the stored digest of a refresh token.
+        
+        Args:
+            token: Raw refresh token string
+            
+        Returns:
+            32-byte keyed blake2b digest
+        """
+        return blake2b(token.encode("utf-8"), digest_size=32, key=self._refresh_token_key).digest()
+    
+    def create_refresh_token(self, user_id: int, db: Session, commit: bool = True) -> str:
         """
         Create a refresh token and store it in the database.
         
         Args:
             user_id: User ID for the token
             db: Database session
+            commit: Whether to commit; pass False to only flush into the caller's transaction
             
         Returns:
             Refresh token string
         """
-        # Generate secure random token
-        token = secrets.token_urlsafe(32)
+        # Generate secure random token; only its digest is persisted
+        token = secrets.token_urlsafe(48)
         
         # Calculate expiration
         expires_at = datetime.utcnow() + timedelta(minutes=self.refresh_token_expire_minutes)
         
         # Store in database
         db_token = RefreshToken(
-            token=token,
+            token_hash=self.hash_refresh_token(token),
             user_id=user_id,
             expires_at=expires_at
         )
         
+        # Flush to get the primary key from the INSERT; no post-commit reload needed
         db.add(db_token)
-        db.commit()
-        db.refresh(db_token)
+        db.flush()
+        token_id = db_token.id
+        if commit:
+            db.commit()
         
         logger.info(
             "🔄 Refresh token created",
             user_id=user_id,
-            token_id=db_token.id,
+            token_id=token_id,
             expires_at=expires_at.isoformat()
         )
         
@@ -104,6 +158,10 @@ class JWTService:
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
         Verify and decode a JWT token.
+        Successful decodes are cached until the token's exp (capped by the
+        cache TTL), so repeat requests with the same token skip the signature check.
+        Access tokens are stateless: revoking refresh tokens does not invalidate
+        them, they remain valid until exp.
         
         Args:
             token: JWT token string
@@ -111,20 +169,26 @@ class JWTService:
         Returns:
             Decoded token payload or None if invalid
         """
+        key = blake2b(token.encode("utf-8"), digest_size=16).digest() if token else None
+        cached = self._get_verified_payload(key)
+        if cached is not None:
+            return dict(cached)
+        
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = jwt.decode(token, self._signing_key, algorithms=self._algorithms)
             
             # Check token type
             if payload.get("type") != "access":
                 logger.warning("Invalid token type", token_type=payload.get("type"))
                 return None
             
-            # Check expiration
+            # Check expiration (exp is a POSIX timestamp, so compare numerically)
             exp = payload.get("exp")
-            if exp and datetime.utcnow() > datetime.fromtimestamp(exp):
+            if exp and time.time() > exp:
                 logger.warning("Token expired", exp=exp)
                 return None
             
+            self._cache_verified_payload(key, payload)
             return payload
             
         except JWTError as e:
@@ -149,6 +213,60 @@ class JWTService:
                 logger.warning("Invalid user ID in token", sub=payload.get("sub"))
         return None
     
+    def invalidate_verified_tokens(self, user_id: int) -> int:
+        """
+        Drop cached access token decodes for a user.
+        This does not revoke anything: access tokens stay valid until their exp
+        and verify again on the next call. It is used alongside user-wide refresh
+        token revocation (password change, deactivation) so those tokens get a
+        fresh signature check.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Number of cached decodes removed
+        """
+        with self._verify_lock:
+            keys = self._verify_index.pop(user_id, set())
+            removed = sum(1 for key in keys if self._verify_cache.pop(key, None) is not None)
+        
+        return removed
+    
+    def _get_verified_payload(self, key: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Get a cached payload for a token digest, dropping it once the token expires."""
+        if key is None or not self._verify_cache_enabled:
+            return None
+        
+        with self._verify_lock:
+            entry: Optional[Tuple[Optional[float], Dict[str, Any]]] = self._verify_cache.get(key)
+            if entry is None:
+                return None
+            
+            exp, payload = entry
+            if exp is not None and time.time() >= exp:
+                self._verify_cache.pop(key, None)
+                return None
+        
+        return payload
+    
+    def _cache_verified_payload(self, key: Optional[bytes], payload: Dict[str, Any]) -> None:
+        """Cache a successfully verified payload, indexed by user for invalidation."""
+        if key is None or not self._verify_cache_enabled:
+            return
+        
+        try:
+            user_id = int(payload.get("sub"))
+        except (ValueError, TypeError):
+            return
+        
+        with self._verify_lock:
+            # Store a copy; the caller owns the payload it was returned
+            self._verify_cache[key] = (payload.get("exp"), dict(payload))
+            keys = self._verify_index.setdefault(user_id, set())
+            keys.difference_update([k for k in keys if k not in self._verify_cache])
+            keys.add(key)
+    
     def verify_refresh_token(self, token: str, db: Session) -> Optional[RefreshToken]:
         """
         Verify a refresh token from the database.
@@ -160,9 +278,10 @@ class JWTService:
         Returns:
             RefreshToken object if valid, None otherwise
         """
-        db_token = db.query(RefreshToken).filter(
-            RefreshToken.token == token,
-            RefreshToken.is_revoked == False
+        # Unique index seek on the digest
+        db_token = db.query(RefreshToken).filter_by(
+            token_hash=self.hash_refresh_token(token),
+            is_revoked=False
         ).first()
         
         if not db_token:
@@ -190,38 +309,31 @@ class JWTService:
         if not db_token:
             return None
         
-        # Get user
-        user = db.query(User).filter(User.id == db_token.user_id).first()
+        # Get user (eager-loaded with the token)
+        user = db_token.user
         if not user or not user.is_active:
             logger.warning("User not found or inactive", user_id=db_token.user_id)
             return None
         
         # Create new access token
-        access_token_data = {
-            "sub": str(user.id),
-            "email": user.email,
-            "role": user.role.value,
-            "full_name": user.full_name
-        }
-        new_access_token = self.create_access_token(access_token_data)
-        
-        # Create new refresh token
-        new_refresh_token = self.create_refresh_token(user.id, db)
+        new_access_token = self.create_access_token(self.build_access_token_claims(user))
         
-        # Revoke old refresh token
+        # Create new refresh token and revoke the old one in a single commit
+        user_id, old_token_id = user.id, db_token.id
+        new_refresh_token = self.create_refresh_token(user_id, db, commit=False)
         db_token.revoke()
         db.commit()
         
         logger.info(
             "🔄 Tokens refreshed",
-            user_id=user.id,
-            old_token_id=db_token.id
+            user_id=user_id,
+            old_token_id=old_token_id
         )
         
         return {
             "access_token": new_access_token,
             "refresh_token": new_refresh_token,
-            "token_type": "bearer"
+            "token_type": TOKEN_TYPE_BEARER
         }
     
     def revoke_refresh_token(self, token: str, db: Session) -> bool:
@@ -233,41 +345,50 @@ class JWTService:
             db: Database session
             
         Returns:
-            True if revoked successfully, False otherwise
+            True if revoked, False if the token is unknown or already revoked
         """
-        db_token = db.query(RefreshToken).filter(RefreshToken.token == token).first()
+        # Single UPDATE ... RETURNING instead of loading the row (and its joined user)
+        revoked = db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == self.hash_refresh_token(token),
+                RefreshToken.is_revoked == False
+            )
+            .values(is_revoked=True)
+            .returning(RefreshToken.id)
+            .execution_options(synchronize_session=False)
+        ).first()
         
-        if db_token:
-            db_token.revoke()
+        if revoked:
+            # Access tokens stay valid until exp, so this session's cached verifications
+            # (and the user's other devices) are left alone
             db.commit()
             
-            logger.info("🔒 Refresh token revoked", token_id=db_token.id)
+            logger.info("🔒 Refresh token revoked", token_id=revoked.id)
             return True
         
         return False
     
-    def revoke_all_user_tokens(self, user_id: int, db: Session) -> int:
+    def revoke_all_user_tokens(self, user_id: int, db: Session, commit: bool = True) -> int:
         """
-        Revoke all refresh tokens for a user.
+        Revoke all refresh tokens for a user with a single bulk UPDATE.
         
         Args:
             user_id: User ID
             db: Database session
+            commit: Whether to commit; pass False to join the caller's transaction
             
         Returns:
             Number of tokens revoked
         """
-        tokens = db.query(RefreshToken).filter(
+        count = db.query(RefreshToken).filter(
             RefreshToken.user_id == user_id,
             RefreshToken.is_revoked == False
-        ).all()
-        
-        count = 0
-        for token in tokens:
-            token.revoke()
-            count += 1
+        ).update({RefreshToken.is_revoked: True}, synchronize_session=False)
         
-        db.commit()
+        if commit:
+            db.commit()
+        self.invalidate_verified_tokens(user_id)
         
         logger.info(
             "🔒 All user tokens revoked",
@@ -279,7 +400,7 @@ class JWTService:
     
     def cleanup_expired_tokens(self, db: Session) -> int:
         """
-        Clean up expired refresh tokens from database.
+        Clean up expired refresh tokens from database with a single bulk DELETE.
         
         Args:
             db: Database session
@@ -287,14 +408,9 @@ class JWTService:
         Returns:
             Number of tokens cleaned up
         """
-        expired_tokens = db.query(RefreshToken).filter(
+        count = db.query(RefreshToken).filter(
             RefreshToken.expires_at < datetime.utcnow()
-        ).all()
-        
-        count = len(expired_tokens)
-        
-        for token in expired_tokens:
-            db.delete(token)
+        ).delete(synchronize_session=False)
         
         db.commit()
         
@@ -1,8 +1,16 @@
 """
 Password service for secure password hashing and verification.
-Uses bcrypt for password security with configurable rounds.
+Uses argon2id for new hashes and still verifies legacy bcrypt hashes,
+which are upgraded on the next successful login.
 """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
+import asyncio
+import os
+import re
+import secrets
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import bcrypt
 import structlog
 from ..core.config import get_settings
@@ -10,45 +18,70 @@ from ..core.config import get_settings
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Prefixes of hashes produced by the previous bcrypt backend
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+# Dedicated pool for CPU-bound password hashing so async handlers don't block
+# the event loop for the full KDF interval (argon2/bcrypt release the GIL).
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="password-hash")
+
+# Reset tokens are random bytes used as-is (256 bits of entropy); they need no hashing
+_RESET_TOKEN_BYTES = 32
+
+# Character classes required by is_password_strong, tracked as bit flags
+_SPECIAL_CHARS = frozenset("!@#$%^&*(),.?\":{}|<>")
+_HAS_UPPER, _HAS_LOWER, _HAS_DIGIT, _HAS_SPECIAL = 1, 2, 4, 8
+_ALL_CLASSES = _HAS_UPPER | _HAS_LOWER | _HAS_DIGIT | _HAS_SPECIAL
+
+_COMMON_PATTERNS = (
+    "password", "123456", "qwerty", "admin", "user",
+    "letmein", "welcome", "monkey", "dragon"
+)
+_COMMON_PATTERN_RE = re.compile("|".join(map(re.escape, _COMMON_PATTERNS)))
+
 
 class PasswordService:
     """
     Service for handling password operations.
-    Provides secure password hashing and verification using bcrypt.
+    Provides secure password hashing and verification using argon2id.
     """
     
-    def __init__(self, rounds: int = 12):
+    def __init__(self, time_cost: int = 3, memory_cost: int = 46 * 1024, parallelism: int = 1):
         """
         Initialize password service.
         
         Args:
-            rounds: Number of bcrypt rounds (default: 12, recommended: 10-15)
+            time_cost: Number of argon2 iterations (default: 3)
+            memory_cost: Memory usage in KiB (default: 46 MiB, OWASP recommendation)
+            parallelism: Number of parallel lanes (default: 1)
         """
-        self.rounds = rounds
-        logger.info("🔐 Password service initialized", bcrypt_rounds=rounds)
+        self.hasher = PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism
+        )
+        logger.info(
+            "🔐 Password service initialized",
+            algorithm="argon2id",
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism
+        )
     
     def hash_password(self, password: str) -> str:
         """
-        Hash a password using bcrypt.
+        Hash a password using argon2id.
         
         Args:
             password: Plain text password
             
         Returns:
-            Bcrypt hashed password string
+            Argon2id encoded hash string
         """
         if not password:
             raise ValueError("Password cannot be empty")
         
-        # Convert password to bytes
-        password_bytes = password.encode('utf-8')
-        
-        # Generate salt and hash
-        salt = bcrypt.gensalt(rounds=self.rounds)
-        hashed = bcrypt.hashpw(password_bytes, salt)
-        
-        # Convert back to string for storage
-        hashed_password = hashed.decode('utf-8')
+        hashed_password = self.hasher.hash(password)
         
         logger.info("🔒 Password hashed successfully")
         
@@ -60,7 +93,7 @@ class PasswordService:
         
         Args:
             password: Plain text password to verify
-            hashed_password: Stored bcrypt hash
+            hashed_password: Stored argon2id (or legacy bcrypt) hash
             
         Returns:
             True if password matches, False otherwise
@@ -70,12 +103,13 @@ class PasswordService:
             return False
         
         try:
-            # Convert to bytes
-            password_bytes = password.encode('utf-8')
-            hashed_bytes = hashed_password.encode('utf-8')
-            
-            # Verify password
-            is_valid = bcrypt.checkpw(password_bytes, hashed_bytes)
+            if hashed_password.startswith(_BCRYPT_PREFIXES):
+                is_valid = bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+            else:
+                try:
+                    is_valid = self.hasher.verify(hashed_password, password)
+                except VerificationError:
+                    is_valid = False
             
             if is_valid:
                 logger.info("✅ Password verification successful")
@@ -88,6 +122,51 @@ class PasswordService:
             logger.error("Password verification error", error=str(e))
             return False
     
+    async def hash_password_async(self, password: str) -> str:
+        """
+        Hash a password on the hash thread pool.
+        
+        Args:
+            password: Plain text password
+            
+        Returns:
+            Argon2id encoded hash string
+        """
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, self.hash_password, password)
+    
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash on the hash thread pool.
+        
+        Args:
+            password: Plain text password to verify
+            hashed_password: Stored argon2id (or legacy bcrypt) hash
+            
+        Returns:
+            True if password matches, False otherwise
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            _hash_pool, self.verify_password, password, hashed_password
+        )
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Check if a stored hash should be upgraded to the current parameters.
+        
+        Args:
+            hashed_password: Stored password hash
+            
+        Returns:
+            True for legacy bcrypt hashes or argon2 hashes with outdated parameters
+        """
+        if hashed_password.startswith(_BCRYPT_PREFIXES):
+            return True
+        
+        try:
+            return self.hasher.check_needs_rehash(hashed_password)
+        except InvalidHashError:
+            return False
+    
     def is_password_strong(self, password: str) -> tuple[bool, list[str]]:
         """
         Check if password meets strength requirements.
@@ -106,30 +185,36 @@ class PasswordService:
         if len(password) > 128:
             issues.append("Password must be less than 128 characters long")
         
-        if not any(c.isupper() for c in password):
+        # Single pass over the password, stopping once every class is seen
+        found = 0
+        for c in password:
+            if c.isupper():
+                found |= _HAS_UPPER
+            elif c.islower():
+                found |= _HAS_LOWER
+            elif c.isdigit():
+                found |= _HAS_DIGIT
+            elif c in _SPECIAL_CHARS:
+                found |= _HAS_SPECIAL
+            if found == _ALL_CLASSES:
+                break
+        
+        if not found & _HAS_UPPER:
             issues.append("Password must contain at least one uppercase letter")
         
-        if not any(c.islower() for c in password):
+        if not found & _HAS_LOWER:
             issues.append("Password must contain at least one lowercase letter")
         
-        if not any(c.isdigit() for c in password):
+        if not found & _HAS_DIGIT:
             issues.append("Password must contain at least one digit")
         
-        special_chars = "!@#$%^&*(),.?\":{}|<>"
-        if not any(c in special_chars for c in password):
+        if not found & _HAS_SPECIAL:
             issues.append("Password must contain at least one special character")
         
-        # Check for common patterns
-        common_patterns = [
-            "password", "123456", "qwerty", "admin", "user",
-            "letmein", "welcome", "monkey", "dragon"
-        ]
-        
-        password_lower = password.lower()
-        for pattern in common_patterns:
-            if pattern in password_lower:
-                issues.append(f"Password cannot contain common pattern: {pattern}")
-                break
+        # Check for common patterns in a single regex scan
+        common = _COMMON_PATTERN_RE.search(password.lower())
+        if common:
+            issues.append(f"Password cannot contain common pattern: {common.group(0)}")
         
         is_strong = len(issues) == 0
         
@@ -147,8 +232,7 @@ class PasswordService:
         Returns:
             Secure random token string
         """
-        import secrets
-        token = secrets.token_urlsafe(32)
+        token = secrets.token_urlsafe(_RESET_TOKEN_BYTES)
         
         logger.info("🔑 Password reset token generated")
         
@@ -165,14 +249,21 @@ class PasswordService:
         Returns:
             True if password is not in history, False if it was used recently
         """
-        for old_hash in password_history:
-            if self.verify_password(password, old_hash):
-                logger.warning("⚠️ Password reuse detected")
-                return False
+        # Verified in turn: the history is capped at a few entries, and fanning out onto
+        # _hash_pool could deadlock when this already runs on a pool thread
+        reused = any(self.verify_password(password, old_hash) for old_hash in password_history)
+        
+        if reused:
+            logger.warning("⚠️ Password reuse detected")
+            return False
         
         logger.info("✅ Password not in recent history")
         return True
 
 
 # Global password service instance
-password_service = PasswordService(rounds=settings.BCRYPT_ROUNDS if hasattr(settings, 'BCRYPT_ROUNDS') else 12) 
\ No newline at end of file
+password_service = PasswordService(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM
+) 
\ No newline at end of file
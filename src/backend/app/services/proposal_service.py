@@ -3,18 +3,29 @@ Proposal Service Layer.
 Handles business logic and database operations for proposal management.
 """
 
-import json
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+import re
+import string
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, cast, delete, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError, NoResultFound, OperationalError
 import logging
 from datetime import datetime, timedelta
 import os
 
-from app.models.proposal import Proposal, ProposalVersion, ProjectTracker, ProposalTemplate
+from app.core.database import _json_serializer
+from app.models.proposal import Proposal, ProposalVersion, ProjectTracker, ProposalShare, ProposalTemplate
 from app.models.proposal import ProjectPhaseEnum, ProposalStatusEnum
 from app.schemas.proposal import ProposalCreate, ProposalUpdate
 
+try:
+    import html2text
+except ImportError:
+    # Needed only for Markdown export
+    html2text = None
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -24,6 +35,231 @@ class ProposalServiceError(Exception):
     pass
 
 
+class ProposalNotFoundError(ProposalServiceError):
+    """Raised when a proposal does not exist."""
+    pass
+
+
+class ProposalConflictError(ProposalServiceError):
+    """Raised when a write violates a database constraint."""
+    pass
+
+
+class ProposalDatabaseUnavailableError(ProposalServiceError):
+    """Raised on database connectivity failures; the operation can be retried."""
+    pass
+
+
+# Database errors surfaced as specific service errors by _transactional
+_DB_ERROR_TYPES = (
+    (NoResultFound, ProposalNotFoundError),
+    (IntegrityError, ProposalConflictError),
+    (OperationalError, ProposalDatabaseUnavailableError),
+)
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _transactional(action: str) -> Callable[[_F], _F]:
+    """
+    Wrap a ProposalService method in the service's error handling.
+    
+    On error the session is rolled back and the exception is re-raised as a
+    ProposalServiceError subclass, keeping transient database failures
+    distinguishable from other errors. Methods commit their own writes.
+    
+    Only the outermost decorated call handles errors: a decorated method called
+    from another one (e.g. get_proposal inside duplicate_proposal) lets
+    exceptions propagate unchanged, so the caller's transaction is rolled back,
+    logged and wrapped exactly once.
+    
+    Args:
+        action: What the method does, used in error messages (e.g. "create proposal")
+        
+    Returns:
+        Method decorator
+    """
+    def decorator(method: _F) -> _F:
+        @wraps(method)
+        def wrapper(self: "ProposalService", *args: Any, **kwargs: Any) -> Any:
+            if self._in_transaction:
+                return method(self, *args, **kwargs)
+            
+            self._in_transaction = True
+            try:
+                return method(self, *args, **kwargs)
+            except ProposalServiceError as e:
+                self.db.rollback()
+                logger.error(f"Failed to {action}: {str(e)}")
+                raise
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Failed to {action}: {str(e)}")
+                error_type = next(
+                    (mapped for source, mapped in _DB_ERROR_TYPES if isinstance(e, source)),
+                    ProposalServiceError
+                )
+                raise error_type(f"Failed to {action}: {str(e)}") from e
+            finally:
+                self._in_transaction = False
+        
+        return wrapper  # type: ignore[return-value]
+    
+    return decorator
+
+
+# Value -> member maps; a dict lookup avoids Enum.__call__ on every request
+_PHASE_MAP = {e.value: e for e in ProjectPhaseEnum}
+_STATUS_MAP = {e.value: e for e in ProposalStatusEnum}
+
+
+def _parse_phase(value: str) -> ProjectPhaseEnum:
+    """Convert a phase string to its enum member."""
+    try:
+        return _PHASE_MAP[value]
+    except KeyError:
+        raise ProposalServiceError(f"Invalid project phase: {value}")
+
+
+def _parse_status(value: str) -> ProposalStatusEnum:
+    """Convert a status string to its enum member."""
+    try:
+        return _STATUS_MAP[value]
+    except KeyError:
+        raise ProposalServiceError(f"Invalid proposal status: {value}")
+
+
+# Patterns for block editing in proposal HTML, compiled once
+_SECTION_SPLIT_RE = re.compile(r'(<section[^>]*>.*?</section>)', re.DOTALL)
+_WHITESPACE_COLLAPSE_RE = re.compile(r'\n\s*\n')
+_BLOCK_TEMPLATE = r'<section[^>]*id="{}"[^>]*>.*?</section>'
+
+
+@lru_cache(maxsize=256)
+def _block_pattern(block_id: str) -> "re.Pattern[str]":
+    """Get the compiled pattern matching the section with the given block ID."""
+    return re.compile(_BLOCK_TEMPLATE.format(re.escape(block_id)), re.DOTALL)
+
+
+def _split_sections(content: str) -> List[str]:
+    """Split proposal HTML into section blocks and the text between them."""
+    return _SECTION_SPLIT_RE.split(content)
+
+
+def _remove_section(content: str, block_id: str) -> str:
+    """Remove the section with the given block ID from proposal HTML."""
+    return _block_pattern(block_id).sub('', content)
+
+
+def _append_metadata_record(proposal: Proposal, key: str, record: Dict[str, Any]) -> None:
+    """
+    Append a record to a list in the proposal's metadata document.
+    
+    The document and list are copied rather than mutated in place, so the
+    JSON column registers the change on flush.
+    """
+    metadata = dict(proposal.proposal_metadata or {})
+    metadata[key] = [*metadata.get(key, []), record]
+    proposal.proposal_metadata = metadata
+
+
+def _append_export_history_jsonb(proposal_id: int, records: List[Dict[str, Any]]):
+    """
+    Build an UPDATE appending records to a proposal's export_history in PostgreSQL.
+    
+    Equivalent to metadata || {"export_history": metadata->'export_history' || records}.
+    """
+    metadata = func.coalesce(Proposal.proposal_metadata, cast({}, JSONB))
+    history = func.coalesce(Proposal.proposal_metadata['export_history'], cast([], JSONB))
+    return (
+        update(Proposal)
+        .where(Proposal.id == proposal_id)
+        .values(
+            proposal_metadata=metadata.op('||')(
+                func.jsonb_build_object('export_history', history.op('||')(cast(records, JSONB)))
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Export files are written through a 1 MiB buffer so generators can emit small chunks
+_EXPORT_WRITE_BUFFER = 1 << 20
+
+
+# Runs of characters not allowed in export filenames (also blocks path separators)
+_SAFE_NAME_RE = re.compile(r'[^\w.-]+')
+
+
+def _safe_filename_part(value: str) -> str:
+    """Reduce a user-supplied name to a filename-safe fragment of at most 64 characters."""
+    return _SAFE_NAME_RE.sub('_', value)[:64]
+
+
+def export_filename(proposal: Proposal, extension: str) -> str:
+    """
+    Build the file name for a proposal export from its sanitized project and client names.
+    
+    Args:
+        proposal: Exported proposal
+        extension: File extension without the dot
+        
+    Returns:
+        File name safe for the export directory and download headers
+    """
+    return f"{_safe_filename_part(proposal.project_name)}_{_safe_filename_part(proposal.client_name)}_proposal.{extension}"
+
+
+# Export directories already created by this process
+_EXPORT_DIRS_CREATED: set = set()
+
+
+def _ensure_export_dir(export_dir: str) -> None:
+    """Create an export directory the first time it is used."""
+    if export_dir not in _EXPORT_DIRS_CREATED:
+        os.makedirs(export_dir, exist_ok=True)
+        _EXPORT_DIRS_CREATED.add(export_dir)
+
+
+def _open_export_file(file_path: str):
+    """Open an export file for buffered binary writing, hinting sequential access where supported."""
+    f = open(file_path, 'wb', buffering=_EXPORT_WRITE_BUFFER)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return f
+
+
+# HTML export document, built once at import
+_HTML_EXPORT_CSS = (
+    "body { font-family: Arial, sans-serif; margin: 20px; }\n"
+    ".proposal-metadata { background: #f5f5f5; padding: 15px; margin-bottom: 20px; }"
+)
+_HTML_EXPORT_SHELL = string.Template(
+    "<!DOCTYPE html>\n"
+    "<html>\n"
+    "<head>\n"
+    "<title>$title</title>\n"
+    "<style>\n$css\n</style>\n"
+    "</head>\n"
+    "<body>\n$body\n</body>\n"
+    "</html>\n"
+)
+
+
+# Columns update_proposal may set; relationships, server-managed columns and
+# the service-maintained metadata document are excluded
+_UPDATABLE_FIELDS = frozenset(
+    attr.key for attr in Proposal.__mapper__.column_attrs
+) - {"id", "created_by", "created_at", "updated_at", "proposal_metadata"}
+
+# Field -> (input type, converter) applied by update_proposal before assignment
+_UPDATE_COERCERS = {
+    "phase": (str, _parse_phase),
+    "status": (str, _parse_status),
+    "extracted_requirements": (dict, _json_serializer),
+}
+
+
 class ProposalService:
     """
     Service layer for proposal management.
@@ -38,7 +274,24 @@ class ProposalService:
             db: Database session
         """
         self.db = db
+        # Set while a _transactional method runs, so nested calls skip error handling
+        self._in_transaction = False
 
+    def _commit(self) -> None:
+        """
+        Commit the session without expiring loaded objects.
+        
+        Proposals returned after a write keep their in-memory state, so
+        serializing them does not re-SELECT every column.
+        """
+        expire_on_commit = self.db.expire_on_commit
+        self.db.expire_on_commit = False
+        try:
+            self.db.commit()
+        finally:
+            self.db.expire_on_commit = expire_on_commit
+
+    @_transactional("create proposal")
     def create_proposal(
         self,
         project_name: str,
@@ -64,40 +317,85 @@ class ProposalService:
         Returns:
             Created proposal object
         """
-        try:
-            # Convert phase string to enum
-            phase_enum = ProjectPhaseEnum(phase)
-            
-            # Create proposal
-            proposal = Proposal(
-                project_name=project_name,
-                client_name=client_name,
-                phase=phase_enum,
-                transcript_path=transcript_path,
-                created_by=created_by,
-                ai_summary=ai_summary,
-                extracted_requirements=json.dumps(extracted_requirements),
+        # Convert phase string to enum
+        phase_enum = _parse_phase(phase)
+        
+        # Create proposal
+        proposal = Proposal(
+            project_name=project_name,
+            client_name=client_name,
+            phase=phase_enum,
+            transcript_path=transcript_path,
+            created_by=created_by,
+            ai_summary=ai_summary,
+            extracted_requirements=_json_serializer(extracted_requirements),
+            status=ProposalStatusEnum.DRAFT
+        )
+        
+        # Flush for the ID; proposal, initial version and tracker commit together
+        self.db.add(proposal)
+        self.db.flush()
+        
+        # Add initial version and project tracker together
+        self.db.add_all([
+            self._new_initial_version(proposal.id, created_by),
+            self._new_project_tracker(proposal.id, project_name, client_name, phase_enum, created_by)
+        ])
+        
+        self._commit()
+        
+        logger.info("Created proposal %s for project: %s", proposal.id, project_name)
+        return proposal
+
+    @_transactional("create proposals")
+    def create_proposals_bulk(self, proposals_data: List[Dict[str, Any]]) -> List[Proposal]:
+        """
+        Create several proposals in one transaction.
+        
+        Proposals are inserted first to get their IDs, then all initial
+        versions and project trackers are added in a single batch.
+        
+        Args:
+            proposals_data: Dictionaries with the create_proposal arguments
+            
+        Returns:
+            Created proposal objects
+        """
+        proposals = [
+            Proposal(
+                project_name=data["project_name"],
+                client_name=data["client_name"],
+                phase=_parse_phase(data["phase"]),
+                transcript_path=data.get("transcript_path"),
+                created_by=data["created_by"],
+                ai_summary=data.get("ai_summary"),
+                extracted_requirements=_json_serializer(data.get("extracted_requirements") or {}),
                 status=ProposalStatusEnum.DRAFT
             )
-            
-            self.db.add(proposal)
-            self.db.commit()
-            self.db.refresh(proposal)
-            
-            # Create initial version
-            self._create_initial_version(proposal.id, created_by)
-            
-            # Create project tracker
-            self._create_project_tracker(proposal.id, project_name, client_name, phase_enum, created_by)
-            
-            logger.info(f"Created proposal {proposal.id} for project: {project_name}")
-            return proposal
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error creating proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to create proposal: {str(e)}")
+            for data in proposals_data
+        ]
+        
+        self.db.add_all(proposals)
+        self.db.flush()
+        
+        dependents = []
+        for proposal in proposals:
+            dependents.append(self._new_initial_version(proposal.id, proposal.created_by))
+            dependents.append(self._new_project_tracker(
+                proposal.id,
+                proposal.project_name,
+                proposal.client_name,
+                proposal.phase,
+                proposal.created_by
+            ))
+        self.db.add_all(dependents)
+        
+        self._commit()
+        
+        logger.info("Created %s proposals in bulk", len(proposals))
+        return proposals
 
+    @_transactional("retrieve proposal")
     def get_proposal(self, proposal_id: int) -> Optional[Proposal]:
         """
         Get proposal by ID.
@@ -108,62 +406,67 @@ class ProposalService:
         Returns:
             Proposal object or None if not found
         """
-        try:
-            return self.db.query(Proposal).filter(Proposal.id == proposal_id).first()
-        except Exception as e:
-            logger.error(f"Error retrieving proposal {proposal_id}: {str(e)}")
-            raise ProposalServiceError(f"Failed to retrieve proposal: {str(e)}")
+        # Primary key lookup; served from the session without a SELECT when already loaded
+        return self.db.get(Proposal, proposal_id)
 
+    @_transactional("list proposals")
     def list_proposals(
         self,
         skip: int = 0,
         limit: int = 100,
         phase: Optional[str] = None,
         status: Optional[str] = None,
-        user_role: str = "admin"
+        user_role: str = "admin",
+        cursor: Optional[int] = None
     ) -> List[Proposal]:
         """
-        List proposals with optional filtering.
+        List proposals with optional filtering, newest first.
         
         Args:
-            skip: Number of records to skip
+            skip: Number of records to skip (ignored when cursor is given)
             limit: Maximum number of records to return
             phase: Filter by project phase
             status: Filter by proposal status
             user_role: User role for access control
+            cursor: Keyset cursor; return proposals with an ID below this
+                (pass the last ID of the previous page)
             
         Returns:
             List of proposals
         """
-        try:
-            query = self.db.query(Proposal)
-            
-            # Apply filters
-            if phase:
-                phase_enum = ProjectPhaseEnum(phase)
-                query = query.filter(Proposal.phase == phase_enum)
-            
-            if status:
-                status_enum = ProposalStatusEnum(status)
-                query = query.filter(Proposal.status == status_enum)
-            
-            # Apply access control
-            if user_role == "client":
-                # Clients can only see approved/sent proposals
-                query = query.filter(
-                    Proposal.status.in_([
-                        ProposalStatusEnum.APPROVED,
-                        ProposalStatusEnum.SENT,
-                        ProposalStatusEnum.ACCEPTED
-                    ])
-                )
-            
-            return query.offset(skip).limit(limit).all()
-            
-        except Exception as e:
-            logger.error(f"Error listing proposals: {str(e)}")
-            raise ProposalServiceError(f"Failed to list proposals: {str(e)}")
+        query = self.db.query(Proposal)
+        
+        # Apply filters
+        if phase:
+            phase_enum = _parse_phase(phase)
+            query = query.filter(Proposal.phase == phase_enum)
+        
+        if status:
+            status_enum = _parse_status(status)
+            query = query.filter(Proposal.status == status_enum)
+        
+        # Apply access control
+        if user_role == "client":
+            # Clients can only see approved/sent proposals
+            query = query.filter(
+                Proposal.status.in_([
+                    ProposalStatusEnum.APPROVED,
+                    ProposalStatusEnum.SENT,
+                    ProposalStatusEnum.ACCEPTED
+                ])
+            )
+        
+        query = query.order_by(Proposal.id.desc())
+        
+        # Keyset pagination seeks on the primary key instead of scanning skipped rows
+        if cursor is not None:
+            query = query.filter(Proposal.id < cursor)
+        elif skip:
+            query = query.offset(skip)
+        
+        return query.limit(limit).all()
 
+    @_transactional("update proposal content")
     def update_proposal_content(
         self,
         proposal_id: int,
@@ -181,29 +484,25 @@ class ProposalService:
         Returns:
             Updated proposal object
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            # Update proposal
-            proposal.content = content
-            proposal.status = ProposalStatusEnum(status)
-            
-            self.db.commit()
-            self.db.refresh(proposal)
-            
-            # Create new version
-            self._create_version(proposal_id, content, proposal.created_by, "Content updated")
-            
-            logger.info(f"Updated content for proposal {proposal_id}")
-            return proposal
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error updating proposal content: {str(e)}")
-            raise ProposalServiceError(f"Failed to update proposal content: {str(e)}")
+        # Single UPDATE ... RETURNING instead of loading the proposal first
+        proposal = self.db.execute(
+            update(Proposal)
+            .where(Proposal.id == proposal_id)
+            .values(content=content, status=_parse_status(status))
+            .returning(Proposal)
+        ).scalar_one_or_none()
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        # Create new version; content and version commit together
+        self._create_version(proposal_id, content, proposal.created_by, "Content updated")
+        
+        self._commit()
+        
+        logger.info("Updated content for proposal %s", proposal_id)
+        return proposal
 
+    @_transactional("update proposal")
     def update_proposal(
         self,
         proposal_id: int,
@@ -219,34 +518,24 @@ class ProposalService:
         Returns:
             Updated proposal object or None if not found
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                return None
-            
-            # Update fields
-            for field, value in update_data.items():
-                if hasattr(proposal, field):
-                    if field == "phase" and isinstance(value, str):
-                        value = ProjectPhaseEnum(value)
-                    elif field == "status" and isinstance(value, str):
-                        value = ProposalStatusEnum(value)
-                    elif field == "extracted_requirements" and isinstance(value, dict):
-                        value = json.dumps(value)
-                    
-                    setattr(proposal, field, value)
-            
-            self.db.commit()
-            self.db.refresh(proposal)
-            
-            logger.info(f"Updated proposal {proposal_id}")
-            return proposal
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error updating proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to update proposal: {str(e)}")
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            return None
+        
+        # Update whitelisted columns only
+        for field in update_data.keys() & _UPDATABLE_FIELDS:
+            value = update_data[field]
+            coercer = _UPDATE_COERCERS.get(field)
+            if coercer and isinstance(value, coercer[0]):
+                value = coercer[1](value)
+            setattr(proposal, field, value)
+        
+        self._commit()
+        
+        logger.info("Updated proposal %s", proposal_id)
+        return proposal
 
+    @_transactional("delete proposal")
     def delete_proposal(self, proposal_id: int) -> bool:
         """
         Delete proposal and related records.
@@ -257,23 +546,24 @@ class ProposalService:
         Returns:
             True if successful, False if not found
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                return False
-            
-            # Delete related records (cascading should handle this)
-            self.db.delete(proposal)
-            self.db.commit()
-            
-            logger.info(f"Deleted proposal {proposal_id}")
-            return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error deleting proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to delete proposal: {str(e)}")
+        if not self.get_proposal(proposal_id):
+            return False
+        
+        # Bulk-delete dependent rows, then the proposal itself, without loading any of them
+        for model in (ProposalVersion, ProposalShare, ProjectTracker):
+            self.db.execute(
+                delete(model)
+                .where(model.proposal_id == proposal_id)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.execute(delete(Proposal).where(Proposal.id == proposal_id))
+        
+        self._commit()
+        
+        logger.info("Deleted proposal %s", proposal_id)
+        return True
 
+    @_transactional("retrieve proposal versions")
     def get_proposal_versions(self, proposal_id: int) -> List[ProposalVersion]:
         """
         Get all versions of a proposal.
@@ -284,17 +574,14 @@ class ProposalService:
         Returns:
             List of proposal versions
         """
-        try:
-            return (
-                self.db.query(ProposalVersion)
-                .filter(ProposalVersion.proposal_id == proposal_id)
-                .order_by(ProposalVersion.version_number.desc())
-                .all()
-            )
-        except Exception as e:
-            logger.error(f"Error retrieving proposal versions: {str(e)}")
-            raise ProposalServiceError(f"Failed to retrieve proposal versions: {str(e)}")
+        return (
+            self.db.query(ProposalVersion)
+            .filter(ProposalVersion.proposal_id == proposal_id)
+            .order_by(ProposalVersion.version_number.desc())
+            .all()
+        )
 
+    @_transactional("retrieve project tracker")
     def get_project_tracker(self, proposal_id: int) -> Optional[ProjectTracker]:
         """
         Get project tracker for a proposal.
@@ -305,16 +592,13 @@ class ProposalService:
         Returns:
             Project tracker object or None if not found
         """
-        try:
-            return (
-                self.db.query(ProjectTracker)
-                .filter(ProjectTracker.proposal_id == proposal_id)
-                .first()
-            )
-        except Exception as e:
-            logger.error(f"Error retrieving project tracker: {str(e)}")
-            raise ProposalServiceError(f"Failed to retrieve project tracker: {str(e)}")
+        return (
+            self.db.query(ProjectTracker)
+            .filter(ProjectTracker.proposal_id == proposal_id)
+            .first()
+        )
 
+    @_transactional("update project phase")
     def update_project_phase(
         self,
         proposal_id: int,
@@ -332,41 +616,35 @@ class ProposalService:
         Returns:
             True if successful
         """
-        try:
-            # Update proposal phase
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                return False
-            
-            old_phase = proposal.phase
-            proposal.phase = ProjectPhaseEnum(new_phase)
-            
-            # Update project tracker
-            tracker = self.get_project_tracker(proposal_id)
-            if tracker:
-                tracker.current_phase = ProjectPhaseEnum(new_phase)
-                
-                # Mark previous phase as completed
-                if mark_completed:
-                    if old_phase == ProjectPhaseEnum.EXPLORATORY:
-                        tracker.exploratory_completed = True
-                    elif old_phase == ProjectPhaseEnum.DISCOVERY:
-                        tracker.discovery_completed = True
-                    elif old_phase == ProjectPhaseEnum.DEVELOPMENT:
-                        tracker.development_completed = True
-            
-            self.db.commit()
-            logger.info(f"Updated project phase for proposal {proposal_id} from {old_phase} to {new_phase}")
-            return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error updating project phase: {str(e)}")
-            raise ProposalServiceError(f"Failed to update project phase: {str(e)}")
+        # Update proposal phase
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            return False
+        
+        old_phase = proposal.phase
+        proposal.phase = _parse_phase(new_phase)
+        
+        # Update project tracker
+        tracker = self.get_project_tracker(proposal_id)
+        if tracker:
+            tracker.current_phase = proposal.phase
+        
+            # Mark previous phase as completed
+            if mark_completed:
+                if old_phase == ProjectPhaseEnum.EXPLORATORY:
+                    tracker.exploratory_completed = True
+                elif old_phase == ProjectPhaseEnum.DISCOVERY:
+                    tracker.discovery_completed = True
+                elif old_phase == ProjectPhaseEnum.DEVELOPMENT:
+                    tracker.development_completed = True
+        
+        self._commit()
+        logger.info("Updated project phase for proposal %s from %s to %s", proposal_id, old_phase, new_phase)
+        return True
 
-    def _create_initial_version(self, proposal_id: int, created_by: int):
-        """Create initial version for a new proposal."""
-        version = ProposalVersion(
+    def _new_initial_version(self, proposal_id: int, created_by: int) -> ProposalVersion:
+        """Build the initial version for a new proposal (added by the caller)."""
+        return ProposalVersion(
             proposal_id=proposal_id,
             version_number=1,
             content="Initial proposal draft",
@@ -374,7 +652,6 @@ class ProposalService:
             created_by=created_by,
             is_current=True
         )
-        self.db.add(version)
 
     def _create_version(
         self,
@@ -383,21 +660,22 @@ class ProposalService:
         created_by: int,
         change_summary: str
     ):
-        """Create a new version of a proposal."""
-        # Mark all existing versions as not current
-        self.db.query(ProposalVersion).filter(
-            ProposalVersion.proposal_id == proposal_id
-        ).update({"is_current": False})
-        
-        # Get next version number
-        last_version = (
-            self.db.query(ProposalVersion)
-            .filter(ProposalVersion.proposal_id == proposal_id)
-            .order_by(ProposalVersion.version_number.desc())
-            .first()
+        """Create a new version of a proposal (committed by the caller)."""
+        # Mark all existing versions as not current; loaded versions are not
+        # synchronized since nothing reads their is_current before the commit
+        self.db.execute(
+            update(ProposalVersion)
+            .where(ProposalVersion.proposal_id == proposal_id)
+            .values(is_current=False)
+            .execution_options(synchronize_session=False)
         )
         
-        next_version = (last_version.version_number + 1) if last_version else 1
+        # Next version number is computed inside the INSERT, not by a separate SELECT
+        next_version = (
+            select(func.coalesce(func.max(ProposalVersion.version_number), 0) + 1)
+            .where(ProposalVersion.proposal_id == proposal_id)
+            .scalar_subquery()
+        )
         
         # Create new version
         version = ProposalVersion(
@@ -410,27 +688,24 @@ class ProposalService:
         )
         self.db.add(version)
 
-    def _create_project_tracker(
+    def _new_project_tracker(
         self,
         proposal_id: int,
         project_name: str,
         client_name: str,
         phase: ProjectPhaseEnum,
         created_by: int
-    ):
-        """Create project tracker for a new proposal."""
-        tracker = ProjectTracker(
+    ) -> ProjectTracker:
+        """Build the project tracker for a new proposal (added by the caller)."""
+        return ProjectTracker(
             proposal_id=proposal_id,
             project_name=project_name,
             client_name=client_name,
             current_phase=phase,
             created_by=created_by
         )
-        self.db.add(tracker)
-        self.db.commit()
-        
-        logger.info(f"Created project tracker for proposal {proposal_id}")
-        
+
+    @_transactional("add block")
     def add_block_to_content(
         self,
         proposal_id: int,
@@ -450,55 +725,51 @@ class ProposalService:
         Returns:
             Updated proposal content
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            current_content = proposal.content or ""
-            
-            # Create block wrapper
-            block_html = f"""
-            <section class="proposal-block" id="block_{block_type}_{proposal_id}">
-                <div class="block-content" data-block-type="{block_type}">
-                    {block_content}
-                </div>
-            </section>
-            """
-            
-            # Insert block at specified position or append
-            if position is not None and current_content:
-                # Split content into sections and insert at position
-                sections = self._parse_content_sections(current_content)
-                if position <= len(sections):
-                    sections.insert(position, block_html)
-                else:
-                    sections.append(block_html)
-                updated_content = "\n".join(sections)
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        current_content = proposal.content or ""
+        
+        # Create block wrapper
+        block_html = f"""
+        <section class="proposal-block" id="block_{block_type}_{proposal_id}">
+            <div class="block-content" data-block-type="{block_type}">
+                {block_content}
+            </div>
+        </section>
+        """
+        
+        # Insert block at specified position or append
+        if position is not None and current_content:
+            # Split content into sections and insert at position
+            sections = self._parse_content_sections(current_content)
+            if position <= len(sections):
+                sections.insert(position, block_html)
             else:
-                # Append to end
-                updated_content = current_content + "\n" + block_html
-            
-            # Update proposal content
-            proposal.content = updated_content
-            self.db.commit()
-            
-            # Create version
-            self._create_version(
-                proposal_id,
-                updated_content,
-                proposal.created_by,
-                f"Added {block_type} block"
-            )
-            
-            logger.info(f"Added {block_type} block to proposal {proposal_id}")
-            return updated_content
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error adding block to proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to add block: {str(e)}")
+                sections.append(block_html)
+            updated_content = "\n".join(sections)
+        else:
+            # Append to end; one join allocates the result once instead of two concatenations
+            updated_content = "\n".join((current_content, block_html))
+        
+        # Update proposal content
+        proposal.content = updated_content
+        
+        # Create version; content and version commit together
+        self._create_version(
+            proposal_id,
+            updated_content,
+            proposal.created_by,
+            f"Added {block_type} block"
+        )
+        
+        self._commit()
+        
+        logger.info("Added %s block to proposal %s", block_type, proposal_id)
+        return updated_content
 
+    @_transactional("remove block")
     def remove_block_from_content(
         self,
         proposal_id: int,
@@ -514,41 +785,35 @@ class ProposalService:
         Returns:
             Updated proposal content
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            current_content = proposal.content or ""
-            
-            # Remove block with matching ID
-            import re
-            pattern = rf'<section[^>]*id="{re.escape(block_id)}"[^>]*>.*?</section>'
-            updated_content = re.sub(pattern, '', current_content, flags=re.DOTALL)
-            
-            # Clean up extra whitespace
-            updated_content = re.sub(r'\n\s*\n', '\n\n', updated_content)
-            
-            # Update proposal content
-            proposal.content = updated_content
-            self.db.commit()
-            
-            # Create version
-            self._create_version(
-                proposal_id,
-                updated_content,
-                proposal.created_by,
-                f"Removed block {block_id}"
-            )
-            
-            logger.info(f"Removed block {block_id} from proposal {proposal_id}")
-            return updated_content
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error removing block from proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to remove block: {str(e)}")
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        current_content = proposal.content or ""
+        
+        # Remove block with matching ID
+        updated_content = _remove_section(current_content, block_id)
+        
+        # Clean up extra whitespace
+        updated_content = _WHITESPACE_COLLAPSE_RE.sub('\n\n', updated_content)
+        
+        # Update proposal content
+        proposal.content = updated_content
+        
+        # Create version; content and version commit together
+        self._create_version(
+            proposal_id,
+            updated_content,
+            proposal.created_by,
+            f"Removed block {block_id}"
+        )
+        
+        self._commit()
+        
+        logger.info("Removed block %s from proposal %s", block_id, proposal_id)
+        return updated_content
 
+    @_transactional("update validation")
     def update_proposal_validation(
         self,
         proposal_id: int,
@@ -568,36 +833,27 @@ class ProposalService:
         Returns:
             Success status
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            # Store validation data in metadata
-            validation_data = {
-                "status": validation_status,
-                "score": validation_score,
-                "issues": validation_issues,
-                "validated_at": json.dumps(datetime.utcnow().isoformat())
-            }
-            
-            # Update proposal metadata
-            current_metadata = {}
-            if hasattr(proposal, 'metadata') and proposal.metadata:
-                current_metadata = json.loads(proposal.metadata)
-            
-            current_metadata['validation'] = validation_data
-            proposal.metadata = json.dumps(current_metadata)
-            
-            self.db.commit()
-            
-            logger.info(f"Updated validation for proposal {proposal_id}: {validation_status}")
-            return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error updating proposal validation: {str(e)}")
-            raise ProposalServiceError(f"Failed to update validation: {str(e)}")
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        # Store validation data in metadata
+        validation_data = {
+            "status": validation_status,
+            "score": validation_score,
+            "issues": validation_issues,
+            "validated_at": datetime.utcnow().isoformat()
+        }
+        
+        # Update proposal metadata; assign a new dict so the JSON column is flagged dirty
+        current_metadata = dict(proposal.proposal_metadata or {})
+        current_metadata['validation'] = validation_data
+        proposal.proposal_metadata = current_metadata
+        
+        self._commit()
+        
+        logger.info("Updated validation for proposal %s: %s", proposal_id, validation_status)
+        return True
 
     def get_proposal_validation(self, proposal_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -611,11 +867,10 @@ class ProposalService:
         """
         try:
             proposal = self.get_proposal(proposal_id)
-            if not proposal or not hasattr(proposal, 'metadata') or not proposal.metadata:
+            if not proposal or not proposal.proposal_metadata:
                 return None
             
-            metadata = json.loads(proposal.metadata)
-            return metadata.get('validation')
+            return proposal.proposal_metadata.get('validation')
             
         except Exception as e:
             logger.error(f"Error getting proposal validation: {str(e)}")
@@ -632,10 +887,8 @@ class ProposalService:
             List of content sections
         """
         try:
-            import re
-            
             # Split by section tags
-            sections = re.split(r'(<section[^>]*>.*?</section>)', content, flags=re.DOTALL)
+            sections = _split_sections(content)
             
             # Filter out empty sections and whitespace-only sections
             sections = [section.strip() for section in sections if section.strip()]
@@ -646,6 +899,7 @@ class ProposalService:
             # Fallback to simple line splitting
             return [line for line in content.split('\n') if line.strip()]
 
+    @_transactional("create share")
     def create_proposal_share(
         self,
         proposal_id: int,
@@ -667,48 +921,58 @@ class ProposalService:
         Returns:
             Share token
         """
-        try:
-            import uuid
-            import hashlib
-            
-            # Generate unique share token
-            share_token = str(uuid.uuid4())
-            
-            # Store share record in metadata (in production, use dedicated table)
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            current_metadata = {}
-            if hasattr(proposal, 'metadata') and proposal.metadata:
-                current_metadata = json.loads(proposal.metadata)
-            
-            if 'shares' not in current_metadata:
-                current_metadata['shares'] = []
-            
-            share_record = {
-                "token": share_token,
-                "share_type": share_type,
-                "created_by": created_by,
-                "created_at": datetime.utcnow().isoformat(),
-                "expires_at": (datetime.utcnow() + timedelta(days=expiry_days)).isoformat() if expiry_days else None,
-                "password_protected": password_protected,
-                "access_count": 0
-            }
-            
-            current_metadata['shares'].append(share_record)
-            proposal.metadata = json.dumps(current_metadata)
-            
-            self.db.commit()
-            
-            logger.info(f"Created share for proposal {proposal_id}: {share_token}")
-            return share_token
+        import uuid
+        
+        # Generate unique share token
+        share_token = str(uuid.uuid4())
+        
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        # One INSERT per share; no read-modify-write of other shares
+        self.db.add(ProposalShare(
+            proposal_id=proposal_id,
+            token=share_token,
+            share_type=share_type,
+            created_by=created_by,
+            expires_at=datetime.utcnow() + timedelta(days=expiry_days) if expiry_days else None,
+            password_protected=password_protected,
+            access_count=0
+        ))
+        
+        self._commit()
+        
+        logger.info("Created share for proposal %s: %s", proposal_id, share_token)
+        return share_token
+
+    @_transactional("record share access")
+    def record_share_access(self, share_token: str) -> Optional[int]:
+        """
+        Count an access through a share link.
+        
+        Args:
+            share_token: Share token
             
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error creating proposal share: {str(e)}")
-            raise ProposalServiceError(f"Failed to create share: {str(e)}")
+        Returns:
+            ID of the shared proposal, or None if the token is unknown or expired
+        """
+        # Atomic increment; concurrent accesses cannot lose counts
+        proposal_id = self.db.execute(
+            update(ProposalShare)
+            .where(
+                ProposalShare.token == share_token,
+                or_(ProposalShare.expires_at.is_(None), ProposalShare.expires_at > datetime.utcnow())
+            )
+            .values(access_count=ProposalShare.access_count + 1)
+            .returning(ProposalShare.proposal_id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        
+        self._commit()
+        return proposal_id
 
+    @_transactional("export proposal")
     def export_proposal(
         self,
         proposal_id: int,
@@ -726,29 +990,20 @@ class ProposalService:
         Returns:
             Export content or file path
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            # Log export activity
-            self._log_export_activity(proposal_id, format)
-            
-            if format == "html":
-                return self._export_to_html(proposal, include_metadata)
-            elif format == "markdown":
-                return self._export_to_markdown(proposal, include_metadata)
-            elif format == "pdf":
-                return self._export_to_pdf(proposal, include_metadata)
-            elif format == "docx":
-                return self._export_to_docx(proposal, include_metadata)
-            else:
-                raise ProposalServiceError(f"Unsupported export format: {format}")
-                
-        except Exception as e:
-            logger.error(f"Error exporting proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to export proposal: {str(e)}")
+        proposal = self.get_proposal(proposal_id)
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        exporter = self._EXPORTERS.get(format)
+        if exporter is None:
+            raise ProposalServiceError(f"Unsupported export format: {format}")
+        
+        # Log export activity
+        self._log_export_activity(proposal, format)
+        
+        return exporter(self, proposal, include_metadata)
 
+    @_transactional("get history")
     def get_proposal_complete_history(self, proposal_id: int) -> Dict[str, Any]:
         """
         Get complete proposal history including versions, shares, and modifications.
@@ -759,41 +1014,50 @@ class ProposalService:
         Returns:
             Complete history data
         """
-        try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                raise ProposalServiceError(f"Proposal {proposal_id} not found")
-            
-            # Get versions
-            versions = self.get_proposal_versions(proposal_id)
-            
-            # Get metadata for shares and other history
-            metadata = {}
-            if hasattr(proposal, 'metadata') and proposal.metadata:
-                metadata = json.loads(proposal.metadata)
-            
-            history = {
-                "versions": [
-                    {
-                        "version_number": v.version_number,
-                        "created_at": v.created_at.isoformat(),
-                        "created_by": v.created_by,
-                        "change_summary": v.change_summary,
-                        "is_current": v.is_current
-                    } for v in versions
-                ],
-                "shares": metadata.get('shares', []),
-                "modifications": metadata.get('modifications', []),
-                "validations": metadata.get('validation_history', []),
-                "exports": metadata.get('export_history', [])
-            }
-            
-            return history
-            
-        except Exception as e:
-            logger.error(f"Error getting proposal history: {str(e)}")
-            raise ProposalServiceError(f"Failed to get history: {str(e)}")
+        # Primary key lookup reuses an already-loaded proposal; versions and shares
+        # come from FK IN-list selects (selectin omits the parent join on its own)
+        proposal = self.db.get(
+            Proposal,
+            proposal_id,
+            options=[selectinload(Proposal.versions), selectinload(Proposal.shares)]
+        )
+        if not proposal:
+            raise ProposalNotFoundError(f"Proposal {proposal_id} not found")
+        
+        versions = sorted(proposal.versions, key=lambda v: v.version_number, reverse=True)
+        
+        # Get metadata for other history
+        metadata = proposal.proposal_metadata or {}
+        
+        history = {
+            "versions": [
+                {
+                    "version_number": v.version_number,
+                    "created_at": v.created_at.isoformat(),
+                    "created_by": v.created_by,
+                    "change_summary": v.change_summary,
+                    "is_current": v.is_current
+                } for v in versions
+            ],
+            "shares": [
+                {
+                    "token": share.token,
+                    "share_type": share.share_type,
+                    "created_by": share.created_by,
+                    "created_at": share.created_at.isoformat() if share.created_at else None,
+                    "expires_at": share.expires_at.isoformat() if share.expires_at else None,
+                    "password_protected": share.password_protected,
+                    "access_count": share.access_count
+                } for share in sorted(proposal.shares, key=lambda share: share.id)
+            ],
+            "modifications": metadata.get('modifications', []),
+            "validations": metadata.get('validation_history', []),
+            "exports": metadata.get('export_history', [])
+        }
+        
+        return history
 
+    @_transactional("duplicate proposal")
     def duplicate_proposal(
         self,
         original_proposal_id: int,
@@ -813,110 +1077,97 @@ class ProposalService:
         Returns:
             New proposal object
         """
-        try:
-            original = self.get_proposal(original_proposal_id)
-            if not original:
-                raise ProposalServiceError(f"Original proposal {original_proposal_id} not found")
-            
-            # Create new proposal with copied content
-            new_proposal = Proposal(
-                project_name=new_project_name,
-                client_name=new_client_name,
-                phase=original.phase,
-                content=original.content,
-                ai_summary=f"Duplicated from {original.project_name}: {original.ai_summary}" if original.ai_summary else None,
-                extracted_requirements=original.extracted_requirements,
-                status=ProposalStatusEnum.DRAFT,
-                created_by=created_by
-            )
-            
-            self.db.add(new_proposal)
-            self.db.commit()
-            self.db.refresh(new_proposal)
-            
-            # Create initial version for new proposal
-            self._create_initial_version(new_proposal.id, created_by)
-            
-            # Create project tracker for new proposal
-            self._create_project_tracker(
-                new_proposal.id, 
-                new_project_name, 
-                new_client_name, 
-                original.phase, 
+        original = self.get_proposal(original_proposal_id)
+        if not original:
+            raise ProposalNotFoundError(f"Original proposal {original_proposal_id} not found")
+        
+        # Create new proposal with copied content
+        new_proposal = Proposal(
+            project_name=new_project_name,
+            client_name=new_client_name,
+            phase=original.phase,
+            content=original.content,
+            ai_summary=f"Duplicated from {original.project_name}: {original.ai_summary}" if original.ai_summary else None,
+            extracted_requirements=original.extracted_requirements,
+            status=ProposalStatusEnum.DRAFT,
+            created_by=created_by
+        )
+        
+        # Flush for the ID; everything below commits in one transaction
+        self.db.add(new_proposal)
+        self.db.flush()
+        
+        # Add initial version and project tracker for new proposal together
+        self.db.add_all([
+            self._new_initial_version(new_proposal.id, created_by),
+            self._new_project_tracker(
+                new_proposal.id,
+                new_project_name,
+                new_client_name,
+                original.phase,
                 created_by
             )
-            
-            # Log duplication activity
-            self._log_duplication_activity(original_proposal_id, new_proposal.id, created_by)
-            
-            logger.info(f"Duplicated proposal {original_proposal_id} to {new_proposal.id}")
-            return new_proposal
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error duplicating proposal: {str(e)}")
-            raise ProposalServiceError(f"Failed to duplicate proposal: {str(e)}")
+        ])
+        
+        # Log duplication activity
+        self._log_duplication_activity(original, new_proposal.id, created_by)
+        
+        self._commit()
+        
+        logger.info("Duplicated proposal %s to %s", original_proposal_id, new_proposal.id)
+        return new_proposal
 
     def _export_to_html(self, proposal: Proposal, include_metadata: bool) -> str:
         """Export proposal to HTML format."""
         content = proposal.content or f"<h1>{proposal.project_name}</h1><p>No content available.</p>"
         
         if include_metadata:
-            metadata_html = f"""
-            <div class="proposal-metadata">
-                <h2>Proposal Metadata</h2>
-                <p><strong>Project:</strong> {proposal.project_name}</p>
-                <p><strong>Client:</strong> {proposal.client_name}</p>
-                <p><strong>Phase:</strong> {proposal.phase.value}</p>
-                <p><strong>Status:</strong> {proposal.status.value}</p>
-                <p><strong>Created:</strong> {proposal.created_at}</p>
-                <p><strong>Last Updated:</strong> {proposal.updated_at}</p>
-            </div>
-            """
-            content = metadata_html + content
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{proposal.project_name} - {proposal.client_name}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .proposal-metadata {{ background: #f5f5f5; padding: 15px; margin-bottom: 20px; }}
-            </style>
-        </head>
-        <body>
-            {content}
-        </body>
-        </html>
-        """
+            content = "".join((
+                '<div class="proposal-metadata">\n<h2>Proposal Metadata</h2>\n',
+                "<p><strong>Project:</strong> ", proposal.project_name, "</p>\n",
+                "<p><strong>Client:</strong> ", proposal.client_name, "</p>\n",
+                "<p><strong>Phase:</strong> ", proposal.phase.value, "</p>\n",
+                "<p><strong>Status:</strong> ", proposal.status.value, "</p>\n",
+                "<p><strong>Created:</strong> ", str(proposal.created_at), "</p>\n",
+                "<p><strong>Last Updated:</strong> ", str(proposal.updated_at), "</p>\n",
+                "</div>\n",
+                content
+            ))
+        
+        return _HTML_EXPORT_SHELL.substitute(
+            title=f"{proposal.project_name} - {proposal.client_name}",
+            css=_HTML_EXPORT_CSS,
+            body=content
+        )
 
     def _export_to_markdown(self, proposal: Proposal, include_metadata: bool) -> str:
         """Export proposal to Markdown format."""
-        import html2text
-        
         content = proposal.content or f"# {proposal.project_name}\n\nNo content available."
         
-        # Convert HTML to Markdown
-        h = html2text.HTML2Text()
-        h.ignore_links = False
-        markdown_content = h.handle(content)
+        if '<' not in content and '&' not in content:
+            # No tags or entities: content is already plain text/Markdown
+            markdown_content = content
+        else:
+            if html2text is None:
+                raise ProposalServiceError("Markdown export requires the html2text package")
+            
+            # Convert HTML to Markdown; HTML2Text accumulates output, so each export needs its own
+            h = html2text.HTML2Text()
+            h.ignore_links = False
+            markdown_content = h.handle(content)
         
         if include_metadata:
-            metadata_md = f"""
-# {proposal.project_name} - {proposal.client_name}
-
-**Project:** {proposal.project_name}  
-**Client:** {proposal.client_name}  
-**Phase:** {proposal.phase.value}  
-**Status:** {proposal.status.value}  
-**Created:** {proposal.created_at}  
-**Last Updated:** {proposal.updated_at}  
-
----
-
-"""
-            markdown_content = metadata_md + markdown_content
+            markdown_content = "".join((
+                "\n# ", proposal.project_name, " - ", proposal.client_name, "\n\n",
+                "**Project:** ", proposal.project_name, "  \n",
+                "**Client:** ", proposal.client_name, "  \n",
+                "**Phase:** ", proposal.phase.value, "  \n",
+                "**Status:** ", proposal.status.value, "  \n",
+                "**Created:** ", str(proposal.created_at), "  \n",
+                "**Last Updated:** ", str(proposal.updated_at), "  \n",
+                "\n---\n\n",
+                markdown_content
+            ))
         
         return markdown_content
 
@@ -925,15 +1176,15 @@ class ProposalService:
         # This would require libraries like weasyprint or reportlab
         # For now, return a placeholder path
         export_dir = "exports/pdf"
-        os.makedirs(export_dir, exist_ok=True)
+        _ensure_export_dir(export_dir)
         
-        filename = f"{proposal.project_name}_{proposal.client_name}_proposal.pdf"
+        filename = export_filename(proposal, "pdf")
         file_path = os.path.join(export_dir, filename)
         
         # In production, generate actual PDF here
         # For now, create a placeholder file
-        with open(file_path, 'w') as f:
-            f.write(f"PDF export for {proposal.project_name} - {proposal.client_name}")
+        with _open_export_file(file_path) as f:
+            f.write(f"PDF export for {proposal.project_name} - {proposal.client_name}".encode())
         
         return file_path
 
@@ -941,70 +1192,58 @@ class ProposalService:
         """Export proposal to DOCX format. Returns file path."""
         # This would require python-docx library
         export_dir = "exports/docx"
-        os.makedirs(export_dir, exist_ok=True)
+        _ensure_export_dir(export_dir)
         
-        filename = f"{proposal.project_name}_{proposal.client_name}_proposal.docx"
+        filename = export_filename(proposal, "docx")
         file_path = os.path.join(export_dir, filename)
         
         # In production, generate actual DOCX here
         # For now, create a placeholder file
-        with open(file_path, 'w') as f:
-            f.write(f"DOCX export for {proposal.project_name} - {proposal.client_name}")
+        with _open_export_file(file_path) as f:
+            f.write(f"DOCX export for {proposal.project_name} - {proposal.client_name}".encode())
         
         return file_path
 
-    def _log_export_activity(self, proposal_id: int, format: str):
-        """Log export activity to proposal metadata."""
+    # Export format -> exporter, looked up once per export
+    _EXPORTERS: Dict[str, Callable[["ProposalService", Proposal, bool], str]] = {
+        "html": _export_to_html,
+        "markdown": _export_to_markdown,
+        "pdf": _export_to_pdf,
+        "docx": _export_to_docx,
+    }
+
+    def _log_export_activity(self, proposal: Proposal, format: str):
+        """Append an export record to proposal metadata and commit it with the caller's session."""
         try:
-            proposal = self.get_proposal(proposal_id)
-            if not proposal:
-                return
-            
-            current_metadata = {}
-            if hasattr(proposal, 'metadata') and proposal.metadata:
-                current_metadata = json.loads(proposal.metadata)
-            
-            if 'export_history' not in current_metadata:
-                current_metadata['export_history'] = []
-            
             export_record = {
                 "format": format,
                 "exported_at": datetime.utcnow().isoformat(),
                 "success": True
             }
             
-            current_metadata['export_history'].append(export_record)
-            proposal.metadata = json.dumps(current_metadata)
+            if self.db.get_bind().dialect.name == "postgresql":
+                # Append server-side: no metadata read, and concurrent exports can't lose records
+                self.db.execute(_append_export_history_jsonb(proposal.id, [export_record]))
+                self.db.expire(proposal, ['proposal_metadata'])
+            else:
+                _append_metadata_record(proposal, 'export_history', export_record)
             
-            self.db.commit()
+            self._commit()
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error logging export activity: {str(e)}")
 
-    def _log_duplication_activity(self, original_id: int, new_id: int, created_by: int):
-        """Log duplication activity to original proposal metadata."""
+    def _log_duplication_activity(self, original: Proposal, new_id: int, created_by: int):
+        """Log duplication activity to original proposal metadata (committed by the caller)."""
         try:
-            proposal = self.get_proposal(original_id)
-            if not proposal:
-                return
-            
-            current_metadata = {}
-            if hasattr(proposal, 'metadata') and proposal.metadata:
-                current_metadata = json.loads(proposal.metadata)
-            
-            if 'duplications' not in current_metadata:
-                current_metadata['duplications'] = []
-            
             duplication_record = {
                 "new_proposal_id": new_id,
                 "created_by": created_by,
                 "duplicated_at": datetime.utcnow().isoformat()
             }
             
-            current_metadata['duplications'].append(duplication_record)
-            proposal.metadata = json.dumps(current_metadata)
-            
-            self.db.commit()
+            _append_metadata_record(original, 'duplications', duplication_record)
             
         except Exception as e:
             logger.error(f"Error logging duplication activity: {str(e)}") 
\ No newline at end of file
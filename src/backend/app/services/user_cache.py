@@ -0,0 +1,191 @@
+"""
+In-process cache for authenticated user lookups.
+Maps access tokens to lightweight user snapshots so protected endpoints can
+skip the JWT decode and full user load on every request.
+"""
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from threading import Lock
+from typing import Optional, Dict, Any, Set, Tuple
+import time
+
+from cachetools import TTLCache
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+import structlog
+
+from ..core.config import get_settings
+from ..models.user import User, UserRole
+
+logger = structlog.get_logger(__name__)
+settings = get_settings()
+
+# Columns never kept in memory; they are lazy-loaded on access if needed
+_EXCLUDED_COLUMNS = frozenset({"hashed_password"})
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Immutable snapshot of a user's column state.
+
+    Attributes:
+        id: User ID
+        email: User email address
+        role: User role
+        is_active: Active flag at snapshot time
+        state: Column values used to rebuild a detached User
+    """
+    id: int
+    email: str
+    role: UserRole
+    is_active: bool
+    state: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        """
+        Build a snapshot from a loaded User instance.
+
+        Args:
+            user: Persistent User object
+
+        Returns:
+            UserSnapshot of the user's current column values
+        """
+        state = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in _EXCLUDED_COLUMNS
+        }
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            state=state
+        )
+
+    def to_user(self) -> User:
+        """
+        Rebuild a detached User from the snapshot without touching the database.
+
+        Returns:
+            Detached User object suitable for Session.merge(load=False)
+        """
+        user = User(**self.state)
+        make_transient_to_detached(user)
+        return user
+
+
+class UserCache:
+    """
+    LRU+TTL cache of access token -> UserSnapshot.
+    Keeps a secondary user_id index so all entries for a user can be
+    invalidated on logout, password change or profile updates.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: int = 60):
+        """
+        Initialize user cache.
+
+        Args:
+            maxsize: Maximum number of cached tokens
+            ttl: Entry lifetime in seconds (0 disables caching)
+        """
+        self.enabled = ttl > 0 and maxsize > 0
+        self._entries: TTLCache = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 1))
+        self._user_index: Dict[int, Set[bytes]] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        """Short, fixed-size cache key for a JWT."""
+        return blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        """
+        Get cached snapshot for an access token.
+
+        Args:
+            token: JWT access token
+
+        Returns:
+            UserSnapshot or None on miss or token expiry
+        """
+        if not self.enabled:
+            return None
+
+        key = self._key(token)
+        with self._lock:
+            entry: Optional[Tuple[Optional[float], UserSnapshot]] = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, snapshot = entry
+            if expires_at is not None and time.time() >= expires_at:
+                self._entries.pop(key, None)
+                return None
+
+        return snapshot
+
+    def set(self, token: str, snapshot: UserSnapshot, expires_at: Optional[float] = None) -> None:
+        """
+        Cache a snapshot for an access token.
+
+        Args:
+            token: JWT access token
+            snapshot: User snapshot to cache
+            expires_at: Token expiry as a Unix timestamp
+        """
+        if not self.enabled:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, snapshot)
+
+            # Drop index entries already evicted by LRU/TTL
+            keys = self._user_index.setdefault(snapshot.id, set())
+            keys.difference_update([k for k in keys if k not in self._entries])
+            keys.add(key)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Remove all cached entries for a user.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = self._user_index.pop(user_id, set())
+            removed = 0
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+
+        if removed:
+            logger.debug("User cache invalidated", user_id=user_id, entries_removed=removed)
+
+        return removed
+
+    def clear(self) -> None:
+        """
+        Remove all cached entries.
+
+        Reset hook for tests and configuration reloads; the global cache
+        otherwise lives for the whole process.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._user_index.clear()
+
+
+# Global user cache instance
+user_cache = UserCache(
+    maxsize=settings.AUTH_USER_CACHE_MAXSIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
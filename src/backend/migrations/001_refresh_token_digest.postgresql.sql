@@ -0,0 +1,16 @@
+-- Refresh tokens are stored as a 32-byte keyed blake2b digest (token_hash)
+-- instead of the raw token string (token). Existing tokens cannot be converted,
+-- so they are deleted; affected users sign in again.
+BEGIN;
+
+DELETE FROM refresh_tokens;
+
+-- Drops ix_refresh_tokens_token with the column
+ALTER TABLE refresh_tokens DROP COLUMN token;
+ALTER TABLE refresh_tokens ADD COLUMN token_hash BYTEA NOT NULL;
+
+CREATE UNIQUE INDEX ix_refresh_tokens_token_hash ON refresh_tokens (token_hash);
+CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id_is_revoked
+    ON refresh_tokens (user_id, is_revoked) WHERE is_revoked = false;
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- Refresh tokens are stored as a 32-byte keyed blake2b digest (token_hash)
+-- instead of the raw token string (token). Existing tokens cannot be converted,
+-- and SQLite cannot add a NOT NULL column without a default, so the table is
+-- recreated empty; affected users sign in again.
+BEGIN;
+
+DROP TABLE refresh_tokens;
+
+CREATE TABLE refresh_tokens (
+	id INTEGER NOT NULL,
+	token_hash BLOB NOT NULL,
+	user_id INTEGER NOT NULL,
+	expires_at DATETIME NOT NULL,
+	is_revoked BOOLEAN NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_refresh_tokens_id ON refresh_tokens (id);
+CREATE UNIQUE INDEX ix_refresh_tokens_token_hash ON refresh_tokens (token_hash);
+CREATE INDEX ix_refresh_tokens_user_id_is_revoked ON refresh_tokens (user_id, is_revoked) WHERE is_revoked = 0;
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- Adds the proposal metadata document (validation results, export and
+-- duplication history) and moves share links into their own table.
+-- Proposal queries select proposals.metadata, so this must run before the
+-- new version starts.
+BEGIN;
+
+ALTER TABLE proposals ADD COLUMN IF NOT EXISTS metadata JSONB;
+
+-- Only present on databases that picked up the interim metadata -> 'shares' index
+DROP INDEX IF EXISTS ix_proposals_metadata_shares;
+
+CREATE TABLE IF NOT EXISTS proposal_shares (
+	id SERIAL NOT NULL,
+	proposal_id INTEGER NOT NULL,
+	token VARCHAR(64) NOT NULL,
+	share_type VARCHAR(50) NOT NULL,
+	expires_at TIMESTAMP WITH TIME ZONE,
+	password_protected BOOLEAN,
+	access_count INTEGER NOT NULL,
+	created_by INTEGER NOT NULL,
+	created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+	PRIMARY KEY (id),
+	FOREIGN KEY(proposal_id) REFERENCES proposals (id),
+	FOREIGN KEY(created_by) REFERENCES users (id)
+);
+CREATE INDEX IF NOT EXISTS ix_proposal_shares_id ON proposal_shares (id);
+CREATE INDEX IF NOT EXISTS ix_proposal_shares_proposal_id ON proposal_shares (proposal_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_proposal_shares_token ON proposal_shares (token);
+
+COMMIT;
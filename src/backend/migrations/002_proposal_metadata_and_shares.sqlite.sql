@@ -0,0 +1,27 @@
+-- Adds the proposal metadata document (validation results, export and
+-- duplication history) and moves share links into their own table.
+-- Proposal queries select proposals.metadata, so this must run before the
+-- new version starts.
+BEGIN;
+
+ALTER TABLE proposals ADD COLUMN metadata JSON;
+
+CREATE TABLE IF NOT EXISTS proposal_shares (
+	id INTEGER NOT NULL,
+	proposal_id INTEGER NOT NULL,
+	token VARCHAR(64) NOT NULL,
+	share_type VARCHAR(50) NOT NULL,
+	expires_at DATETIME,
+	password_protected BOOLEAN,
+	access_count INTEGER NOT NULL,
+	created_by INTEGER NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (id),
+	FOREIGN KEY(proposal_id) REFERENCES proposals (id),
+	FOREIGN KEY(created_by) REFERENCES users (id)
+);
+CREATE INDEX IF NOT EXISTS ix_proposal_shares_id ON proposal_shares (id);
+CREATE INDEX IF NOT EXISTS ix_proposal_shares_proposal_id ON proposal_shares (proposal_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_proposal_shares_token ON proposal_shares (token);
+
+COMMIT;
@@ -2,8 +2,14 @@
 Comprehensive test suite for JDA AI Portal authentication system.
 Tests JWT services, password security, user registration/login, and RBAC.
 """
+import asyncio
+import itertools
 import pytest
 from datetime import datetime, timedelta
+from hashlib import blake2b
+from types import SimpleNamespace
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -11,10 +17,18 @@ from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.core.database import Base, get_db
+from app.core.security import (
+    get_current_admin_identity,
+    get_current_admin_user,
+    get_current_user,
+    get_current_user_identity,
+)
 from app.models.user import User, UserRole, UserStatus, RefreshToken
-from app.services.jwt_service import jwt_service
+from app.services.jwt_service import JWTService, jwt_service
 from app.services.password_service import password_service
 from app.services.auth_service import auth_service, AuthenticationError
+from app.services.user_cache import UserCache, UserSnapshot, user_cache
+from app.schemas.user import UserCreate, UserLogin
 
 
 # Test database setup
@@ -41,6 +55,16 @@ app.dependency_overrides[get_db] = override_get_db
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_auth_caches():
+    """Start every test with empty process-wide auth caches."""
+    user_cache.clear()
+    with jwt_service._verify_lock:
+        jwt_service._verify_cache.clear()
+        jwt_service._verify_index.clear()
+    yield
+
+
 @pytest.fixture
 def db_session():
     """Create test database session."""
@@ -92,7 +116,7 @@ class TestPasswordService:
         
         assert hashed != password
         assert len(hashed) > 50
-        assert hashed.startswith("$2b$")
+        assert hashed.startswith("$argon2id$")
     
     def test_password_verification(self):
         """Test password verification works correctly."""
@@ -102,6 +126,26 @@ class TestPasswordService:
         assert password_service.verify_password(password, hashed) is True
         assert password_service.verify_password("WrongPassword", hashed) is False
     
+    def test_legacy_bcrypt_hash_verified_and_flagged_for_rehash(self):
+        """Test legacy bcrypt hashes still verify and are marked for upgrade."""
+        import bcrypt
+        
+        password = "TestPassword123!"
+        legacy_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode("utf-8")
+        
+        assert password_service.verify_password(password, legacy_hash) is True
+        assert password_service.verify_password("WrongPassword", legacy_hash) is False
+        assert password_service.needs_rehash(legacy_hash) is True
+        assert password_service.needs_rehash(password_service.hash_password(password)) is False
+    
+    def test_password_history(self):
+        """Test a password found anywhere in the history is reported as reused."""
+        history = [password_service.hash_password(old) for old in ("OldPass123!", "OlderPass123!")]
+        
+        assert password_service.check_password_history("OlderPass123!", history) is False
+        assert password_service.check_password_history("NewPass123!", history) is True
+        assert password_service.check_password_history("NewPass123!", []) is True
+    
     def test_password_strength_validation(self):
         """Test password strength requirements."""
         is_strong, issues = password_service.is_password_strong("StrongPass123!")
@@ -111,6 +155,10 @@ class TestPasswordService:
         is_strong, issues = password_service.is_password_strong("weak")
         assert is_strong is False
         assert len(issues) > 0
+        
+        is_strong, issues = password_service.is_password_strong("MyQwerty123!")
+        assert is_strong is False
+        assert issues == ["Password cannot contain common pattern: qwerty"]
 
 
 class TestJWTService:
@@ -140,6 +188,293 @@ class TestJWTService:
         assert jwt_service.verify_token("") is None
 
 
+class TestVerifiedTokenCache:
+    """Test the verified access token payload cache in JWTService."""
+    
+    @pytest.fixture
+    def decode_calls(self, monkeypatch):
+        """Count signature-checking decodes performed by verify_token."""
+        import app.services.jwt_service as jwt_module
+        
+        calls = []
+        decode = jwt_module.jwt.decode
+        
+        def counting_decode(*args, **kwargs):
+            calls.append(args[0])
+            return decode(*args, **kwargs)
+        
+        monkeypatch.setattr(jwt_module.jwt, "decode", counting_decode)
+        return calls
+    
+    def test_repeat_verification_served_from_cache(self, decode_calls):
+        """Test a verified token is decoded once and callers get independent copies."""
+        service = JWTService()
+        token = service.create_access_token({"sub": "7"})
+        
+        first = service.verify_token(token)
+        first["sub"] = "tampered"
+        second = service.verify_token(token)
+        
+        assert len(decode_calls) == 1
+        assert second["sub"] == "7"
+    
+    def test_invalid_tokens_not_cached(self, decode_calls):
+        """Test failed verifications are decoded again on every call."""
+        service = JWTService()
+        
+        assert service.verify_token("invalid.token.here") is None
+        assert service.verify_token("invalid.token.here") is None
+        assert len(decode_calls) == 2
+    
+    def test_cached_payload_not_served_past_exp(self, monkeypatch):
+        """Test cached entries stop being served once the token's exp passes."""
+        import app.services.jwt_service as jwt_module
+        
+        service = JWTService()
+        token = service.create_access_token({"sub": "7"})
+        exp = service.verify_token(token)["exp"]
+        
+        monkeypatch.setattr(jwt_module, "time", SimpleNamespace(time=lambda: exp + 1))
+        
+        assert service._get_verified_payload(blake2b(token.encode("utf-8"), digest_size=16).digest()) is None
+        assert service.verify_token(token) is None
+    
+    def test_user_invalidation_drops_cached_payloads(self, decode_calls):
+        """Test invalidating a user forces their tokens to be verified again."""
+        service = JWTService()
+        token = service.create_access_token({"sub": "7"})
+        other = service.create_access_token({"sub": "8"})
+        service.verify_token(token)
+        service.verify_token(other)
+        
+        assert service.invalidate_verified_tokens(7) == 1
+        
+        service.verify_token(token)
+        service.verify_token(other)
+        assert decode_calls.count(token) == 2
+        assert decode_calls.count(other) == 1
+
+
+class TestRefreshTokenStorage:
+    """Test refresh tokens are persisted and looked up by their keyed digest."""
+    
+    def _user(self, db_session) -> User:
+        user = User(email="refresh@example.com", hashed_password="x", first_name="Refresh", last_name="User")
+        db_session.add(user)
+        db_session.commit()
+        return user
+    
+    def test_only_digest_is_stored(self, db_session):
+        """Test the stored row holds a 32-byte digest of the token, never the token."""
+        user = self._user(db_session)
+        token = jwt_service.create_refresh_token(user.id, db_session)
+        
+        stored = db_session.query(RefreshToken).filter_by(user_id=user.id).one()
+        assert stored.token_hash == jwt_service.hash_refresh_token(token)
+        assert len(stored.token_hash) == 32
+        assert token.encode("utf-8") not in stored.token_hash
+    
+    def test_digest_is_keyed(self):
+        """Test the digest depends on the pepper, not just the token."""
+        other = JWTService()
+        other._refresh_token_key = b"\x00" * 32
+        
+        assert other.hash_refresh_token("token") != jwt_service.hash_refresh_token("token")
+    
+    def test_lookup_by_digest(self, db_session):
+        """Test verification finds the token by digest and rejects unknown tokens."""
+        user = self._user(db_session)
+        token = jwt_service.create_refresh_token(user.id, db_session)
+        
+        db_token = jwt_service.verify_refresh_token(token, db_session)
+        assert db_token is not None
+        assert db_token.user_id == user.id
+        assert jwt_service.verify_refresh_token(token + "x", db_session) is None
+
+
+class TestRefreshTokenRevocation:
+    """Test single refresh token revocation via UPDATE ... RETURNING."""
+    
+    def _user(self, db_session) -> User:
+        user = User(email="revoke@example.com", hashed_password="x", first_name="Revoke", last_name="User")
+        db_session.add(user)
+        db_session.commit()
+        return user
+    
+    def test_revoke_marks_only_that_token(self, db_session):
+        """Test revocation flags the matching row and leaves the user's other tokens active."""
+        user = self._user(db_session)
+        token = jwt_service.create_refresh_token(user.id, db_session)
+        other = jwt_service.create_refresh_token(user.id, db_session)
+        
+        assert jwt_service.revoke_refresh_token(token, db_session) is True
+        
+        assert jwt_service.verify_refresh_token(token, db_session) is None
+        assert jwt_service.verify_refresh_token(other, db_session) is not None
+        revoked = db_session.query(RefreshToken).filter_by(
+            token_hash=jwt_service.hash_refresh_token(token)
+        ).one()
+        db_session.refresh(revoked)
+        assert revoked.is_revoked is True
+    
+    def test_revoke_twice(self, db_session):
+        """Test revoking an already revoked token reports False."""
+        user = self._user(db_session)
+        token = jwt_service.create_refresh_token(user.id, db_session)
+        
+        assert jwt_service.revoke_refresh_token(token, db_session) is True
+        assert jwt_service.revoke_refresh_token(token, db_session) is False
+    
+    def test_revoke_unknown_token(self, db_session):
+        """Test revoking a token that was never issued reports False and changes nothing."""
+        user = self._user(db_session)
+        token = jwt_service.create_refresh_token(user.id, db_session)
+        
+        assert jwt_service.revoke_refresh_token("never-issued", db_session) is False
+        assert db_session.query(RefreshToken).filter_by(is_revoked=True).count() == 0
+        assert jwt_service.verify_refresh_token(token, db_session) is not None
+    
+    def test_single_revocation_keeps_cached_payloads(self, db_session):
+        """Test logging out one session leaves the user's cached verifications in place."""
+        user = self._user(db_session)
+        service = JWTService()
+        access_token = service.create_access_token({"sub": str(user.id)})
+        service.verify_token(access_token)
+        
+        assert service.revoke_refresh_token(service.create_refresh_token(user.id, db_session), db_session) is True
+        assert service.invalidate_verified_tokens(user.id) == 1
+
+
+class TestUserCache:
+    """Test access token -> user cache."""
+    
+    def _snapshot(self, user_id: int = 1) -> UserSnapshot:
+        return UserSnapshot(
+            id=user_id,
+            email="cache@example.com",
+            role=UserRole.CLIENT,
+            is_active=True,
+            state={"id": user_id, "email": "cache@example.com"}
+        )
+    
+    def test_cache_hit_and_user_invalidation(self):
+        """Test cached snapshots are returned until the user is invalidated."""
+        cache = UserCache(maxsize=10, ttl=60)
+        cache.set("token-a", self._snapshot())
+        cache.set("token-b", self._snapshot())
+        
+        assert cache.get("token-a").id == 1
+        assert cache.invalidate_user(1) == 2
+        assert cache.get("token-a") is None
+        assert cache.get("token-b") is None
+    
+    def test_expired_token_not_served(self):
+        """Test entries past the token expiry are treated as misses."""
+        cache = UserCache(maxsize=10, ttl=60)
+        cache.set("token", self._snapshot(), expires_at=datetime.utcnow().timestamp() - 1)
+        
+        assert cache.get("token") is None
+    
+    def test_zero_ttl_disables_cache(self):
+        """Test a TTL of 0 disables caching."""
+        cache = UserCache(maxsize=10, ttl=0)
+        cache.set("token", self._snapshot())
+        
+        assert cache.get("token") is None
+
+
+class TestUserCacheRevalidation:
+    """Test cached users are re-checked against the database on every hit."""
+    
+    def _cached_token(self, db_session) -> tuple:
+        user = User(email="cached@example.com", hashed_password="x", first_name="Cached", last_name="User")
+        db_session.add(user)
+        db_session.commit()
+        token = jwt_service.create_access_token(jwt_service.build_access_token_claims(user))
+        assert auth_service.get_current_user(token, db_session).id == user.id
+        assert user_cache.get(token) is not None
+        return user, token
+    
+    def test_deactivation_without_invalidation(self, db_session):
+        """Test a user deactivated behind the cache's back is rejected on the next hit."""
+        user, token = self._cached_token(db_session)
+        db_session.query(User).filter(User.id == user.id).update({"is_active": False})
+        db_session.commit()
+        
+        assert auth_service.get_current_user_identity(token, db_session) is None
+        assert auth_service.get_current_user(token, db_session) is None
+        assert user_cache.get(token) is None
+    
+    def test_role_change_without_invalidation(self, db_session):
+        """Test a role changed behind the cache's back is served on the next hit."""
+        user, token = self._cached_token(db_session)
+        db_session.query(User).filter(User.id == user.id).update({"role": UserRole.ADMIN})
+        db_session.commit()
+        
+        assert auth_service.get_current_user_identity(token, db_session).role == UserRole.ADMIN
+        assert auth_service.get_current_user(token, db_session).role == UserRole.ADMIN
+
+
+class TestAsyncAuthVariants:
+    """Test the *_async auth paths that run the KDF on the hash thread pool."""
+    
+    def test_password_service_async(self):
+        """Test async hashing and verification match the sync results."""
+        hashed = asyncio.run(password_service.hash_password_async("TestPassword123!"))
+        
+        assert hashed.startswith("$argon2id$")
+        assert asyncio.run(password_service.verify_password_async("TestPassword123!", hashed)) is True
+        assert asyncio.run(password_service.verify_password_async("WrongPassword", hashed)) is False
+    
+    def test_register_and_authenticate_async(self, sample_user_data, db_session):
+        """Test async registration stores an argon2id hash and async login issues tokens."""
+        user, tokens = asyncio.run(auth_service.register_user_async(UserCreate(**sample_user_data), db_session))
+        
+        assert user.hashed_password.startswith("$argon2id$")
+        assert tokens["token_type"] == "bearer"
+        
+        login = UserLogin(email=sample_user_data["email"], password=sample_user_data["password"])
+        logged_in, tokens = asyncio.run(auth_service.authenticate_user_async(login, db_session))
+        assert logged_in.id == user.id
+        assert jwt_service.verify_refresh_token(tokens["refresh_token"], db_session) is not None
+        
+        wrong = UserLogin(email=sample_user_data["email"], password="WrongPass123!")
+        with pytest.raises(AuthenticationError):
+            asyncio.run(auth_service.authenticate_user_async(wrong, db_session))
+    
+    def test_authenticate_async_upgrades_legacy_hash(self, db_session):
+        """Test async login rehashes a legacy bcrypt hash with argon2id."""
+        import bcrypt
+        
+        user = User(
+            email="legacy@example.com",
+            hashed_password=bcrypt.hashpw(b"LegacyPass123!", bcrypt.gensalt(rounds=4)).decode("utf-8"),
+            first_name="Legacy",
+            last_name="User"
+        )
+        db_session.add(user)
+        db_session.commit()
+        
+        login = UserLogin(email="legacy@example.com", password="LegacyPass123!")
+        asyncio.run(auth_service.authenticate_user_async(login, db_session))
+        
+        db_session.refresh(user)
+        assert user.hashed_password.startswith("$argon2id$")
+    
+    def test_change_password_async(self, sample_user_data, db_session):
+        """Test async password change checks the current password and stores the new hash."""
+        user, _ = auth_service.register_user(UserCreate(**sample_user_data), db_session)
+        
+        with pytest.raises(AuthenticationError):
+            asyncio.run(auth_service.change_password_async(user.id, "WrongPass123!", "NewPass456!", db_session))
+        
+        assert asyncio.run(
+            auth_service.change_password_async(user.id, sample_user_data["password"], "NewPass456!", db_session)
+        ) is True
+        db_session.refresh(user)
+        assert password_service.verify_password("NewPass456!", user.hashed_password) is True
+
+
 class TestAPIEndpoints:
     """Test API endpoints functionality."""
     
@@ -335,6 +670,77 @@ class TestRBAC:
         assert response.status_code == 401
 
 
+class TestIdentityDependencies:
+    """Test the column-only identity dependencies against the full-user ones."""
+    
+    # Distinct emails give every user distinct token claims
+    _emails = (f"user{n}@identity.test" for n in itertools.count())
+    
+    def _user(self, db_session, role=UserRole.CLIENT, is_active=True) -> User:
+        user = User(
+            email=next(self._emails),
+            hashed_password="x",
+            first_name="Identity",
+            last_name="User",
+            role=role,
+            is_active=is_active
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+    
+    def _credentials(self, user: User) -> HTTPAuthorizationCredentials:
+        token = jwt_service.create_access_token(jwt_service.build_access_token_claims(user))
+        return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    
+    def test_identity_matches_user(self, db_session):
+        """Test both dependencies resolve the same principal for a valid token."""
+        user = self._user(db_session)
+        credentials = self._credentials(user)
+        
+        identity = asyncio.run(get_current_user_identity(credentials, db_session))
+        full_user = asyncio.run(get_current_user(credentials, db_session))
+        
+        assert identity == (user.id, UserRole.CLIENT, True)
+        assert full_user.id == identity.id
+    
+    @pytest.mark.parametrize("dependency", [get_current_user, get_current_user_identity])
+    def test_missing_and_invalid_credentials_rejected(self, dependency, db_session):
+        """Test missing or invalid tokens are rejected with 401 by both dependencies."""
+        with pytest.raises(HTTPException) as missing:
+            asyncio.run(dependency(None, db_session))
+        assert missing.value.status_code == 401
+        
+        invalid = HTTPAuthorizationCredentials(scheme="Bearer", credentials="invalid-token")
+        with pytest.raises(HTTPException) as rejected:
+            asyncio.run(dependency(invalid, db_session))
+        assert rejected.value.status_code == 401
+    
+    @pytest.mark.parametrize("dependency", [get_current_user, get_current_user_identity])
+    def test_inactive_user_rejected(self, dependency, db_session):
+        """Test tokens of deactivated users are rejected by both dependencies."""
+        user = self._user(db_session, is_active=False)
+        
+        with pytest.raises(HTTPException) as rejected:
+            asyncio.run(dependency(self._credentials(user), db_session))
+        assert rejected.value.status_code == 401
+    
+    def test_admin_dependencies(self, db_session):
+        """Test both admin dependencies accept admins and reject other roles with 403."""
+        admin = self._user(db_session, role=UserRole.ADMIN)
+        client_user = self._user(db_session)
+        
+        admin_identity = asyncio.run(get_current_user_identity(self._credentials(admin), db_session))
+        assert asyncio.run(get_current_admin_identity(admin_identity)).id == admin.id
+        assert asyncio.run(get_current_admin_user(admin)).id == admin.id
+        
+        client_identity = asyncio.run(get_current_user_identity(self._credentials(client_user), db_session))
+        for dependency, principal in ((get_current_admin_identity, client_identity), (get_current_admin_user, client_user)):
+            with pytest.raises(HTTPException) as forbidden:
+                asyncio.run(dependency(principal))
+            assert forbidden.value.status_code == 403
+
+
 class TestUserProfile:
     """Test user profile functionality."""
     
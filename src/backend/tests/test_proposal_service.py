@@ -0,0 +1,421 @@
+"""
+Test suite for the proposal service.
+Runs the service against an in-memory SQLite database.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Delete, create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.user import User
+from app.models.proposal import Proposal, ProposalShare
+from app.services import proposal_service as proposal_module
+from app.services.proposal_service import (
+    ProposalDatabaseUnavailableError,
+    ProposalNotFoundError,
+    ProposalService,
+    ProposalServiceError,
+)
+
+
+# Test database setup
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CONTENT = (
+    "<style>.proposal { color: #333; }</style>\n"
+    "<h1>Intro</h1>\n"
+    '<section class="proposal-block" id="block_scope_1">Scope</section>\n'
+    "<p>Between blocks</p>\n"
+    '<section class="proposal-block" id="block_budget_1">Budget</section>\n'
+)
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session."""
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def user(db_session):
+    """Create the user that owns test proposals."""
+    user = User(email="owner@example.com", hashed_password="x", first_name="Proposal", last_name="Owner")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def service(db_session):
+    """Proposal service bound to the test session."""
+    return ProposalService(db_session)
+
+
+@pytest.fixture
+def proposal(service, user):
+    """Create a proposal with block content."""
+    proposal = service.create_proposal("Portal", "Acme", "exploratory", "/t.txt", user.id, "Summary", {"a": 1})
+    service.update_proposal_content(proposal.id, CONTENT, "draft")
+    return proposal
+
+
+def _versions(service, proposal_id):
+    return [(v.version_number, v.is_current) for v in service.get_proposal_versions(proposal_id)]
+
+
+class TestCreateProposal:
+    """Test proposal creation."""
+
+    def test_create_adds_initial_version_and_tracker(self, service, user):
+        """Test a new proposal starts as a draft with version 1 and a project tracker."""
+        proposal = service.create_proposal("Portal", "Acme", "discovery", "/t.txt", user.id, "Summary", {"a": 1})
+
+        assert proposal.status.value == "draft"
+        assert _versions(service, proposal.id) == [(1, True)]
+        tracker = service.get_project_tracker(proposal.id)
+        assert (tracker.project_name, tracker.current_phase.value) == ("Portal", "discovery")
+
+    def test_bulk_create_adds_dependents_per_proposal(self, service, user):
+        """Test bulk creation gives every proposal its own initial version and tracker."""
+        proposals = service.create_proposals_bulk([
+            {"project_name": f"Project {i}", "client_name": "Acme", "phase": "exploratory", "created_by": user.id}
+            for i in range(3)
+        ])
+
+        for proposal in proposals:
+            assert _versions(service, proposal.id) == [(1, True)]
+            assert service.get_project_tracker(proposal.id).project_name == proposal.project_name
+
+
+class TestVersioning:
+    """Test version numbering on content updates."""
+
+    def test_updates_number_versions_sequentially(self, service, proposal):
+        """Test each update adds the next version number and only the newest is current."""
+        service.update_proposal_content(proposal.id, "<p>Third</p>", "in_review")
+
+        assert _versions(service, proposal.id) == [(3, True), (2, False), (1, False)]
+        assert service.get_proposal(proposal.id).status.value == "in_review"
+
+    def test_version_numbers_are_per_proposal(self, service, user, proposal):
+        """Test numbering of one proposal does not continue from another's versions."""
+        other = service.create_proposal("Other", "Acme", "exploratory", "/o.txt", user.id, "Summary", {})
+        service.update_proposal_content(other.id, "<p>Other</p>")
+
+        assert _versions(service, other.id) == [(2, True), (1, False)]
+
+    def test_update_missing_proposal(self, service):
+        """Test updating content of a missing proposal raises ProposalNotFoundError."""
+        with pytest.raises(ProposalNotFoundError):
+            service.update_proposal_content(999, "<p>Nothing</p>")
+
+
+class TestListProposals:
+    """Test proposal listing and keyset pagination."""
+
+    @pytest.fixture
+    def proposal_ids(self, service, user):
+        """Create five proposals and return their IDs."""
+        proposals = service.create_proposals_bulk([
+            {"project_name": f"Project {i}", "client_name": "Acme", "phase": "exploratory", "created_by": user.id}
+            for i in range(5)
+        ])
+        return [proposal.id for proposal in proposals]
+
+    def test_cursor_pages_newest_first(self, service, proposal_ids):
+        """Test following the cursor walks every proposal once, newest first."""
+        first = service.list_proposals(limit=2)
+        second = service.list_proposals(limit=2, cursor=first[-1].id)
+        third = service.list_proposals(limit=2, cursor=second[-1].id)
+
+        seen = [proposal.id for proposal in first + second + third]
+        assert seen == sorted(proposal_ids, reverse=True)
+        assert service.list_proposals(limit=2, cursor=third[-1].id) == []
+
+    def test_cursor_ignores_skip(self, service, proposal_ids):
+        """Test skip has no effect once a cursor is given."""
+        cursor = proposal_ids[-1]
+
+        assert service.list_proposals(skip=3, limit=2, cursor=cursor) == service.list_proposals(limit=2, cursor=cursor)
+
+    def test_client_sees_only_released_proposals(self, service, proposal_ids):
+        """Test clients only see approved, sent or accepted proposals."""
+        service.update_proposal(proposal_ids[1], {"status": "approved"})
+
+        assert [p.id for p in service.list_proposals(user_role="client")] == [proposal_ids[1]]
+        assert len(service.list_proposals(status="draft")) == 4
+
+
+class TestShares:
+    """Test share links and access counting."""
+
+    def test_record_access_counts_each_use(self, service, user, proposal):
+        """Test each access increments the count and returns the shared proposal."""
+        token = service.create_proposal_share(proposal.id, "view", user.id, expiry_days=7)
+
+        assert service.record_share_access(token) == proposal.id
+        assert service.record_share_access(token) == proposal.id
+
+        shares = service.get_proposal_complete_history(proposal.id)["shares"]
+        assert [(share["token"], share["access_count"]) for share in shares] == [(token, 2)]
+
+    def test_unknown_or_expired_token(self, service, user, proposal, db_session):
+        """Test unknown and expired tokens return None and are not counted."""
+        token = service.create_proposal_share(proposal.id, "view", user.id)
+        share = db_session.query(ProposalShare).filter_by(token=token).one()
+        share.expires_at = datetime.utcnow() - timedelta(days=1)
+        db_session.commit()
+
+        assert service.record_share_access("missing") is None
+        assert service.record_share_access(token) is None
+        db_session.refresh(share)
+        assert share.access_count == 0
+
+    def test_share_missing_proposal(self, service, user):
+        """Test sharing a missing proposal raises ProposalNotFoundError."""
+        with pytest.raises(ProposalNotFoundError):
+            service.create_proposal_share(999, "view", user.id)
+
+
+class TestHistory:
+    """Test the complete proposal history."""
+
+    def test_history_lists_versions_newest_first(self, service, proposal):
+        """Test versions are listed newest first with their change summaries."""
+        versions = service.get_proposal_complete_history(proposal.id)["versions"]
+
+        assert [(v["version_number"], v["is_current"]) for v in versions] == [(2, True), (1, False)]
+        assert versions[0]["change_summary"] == "Content updated"
+
+    def test_history_of_missing_proposal(self, service):
+        """Test history of a missing proposal raises ProposalNotFoundError."""
+        with pytest.raises(ProposalNotFoundError):
+            service.get_proposal_complete_history(999)
+
+
+class TestBlockEditing:
+    """Test section splitting, block insertion and block removal."""
+
+    def test_split_keeps_text_between_sections(self):
+        """Test splitting yields each section whole plus the text around it."""
+        assert proposal_module._split_sections(CONTENT) == [
+            "<style>.proposal { color: #333; }</style>\n<h1>Intro</h1>\n",
+            '<section class="proposal-block" id="block_scope_1">Scope</section>',
+            "\n<p>Between blocks</p>\n",
+            '<section class="proposal-block" id="block_budget_1">Budget</section>',
+            "\n",
+        ]
+
+    def test_remove_section_only_touches_matching_block(self):
+        """Test removal drops the matching section and keeps everything else verbatim."""
+        assert proposal_module._remove_section(CONTENT, "block_scope_1") == (
+            "<style>.proposal { color: #333; }</style>\n"
+            "<h1>Intro</h1>\n"
+            "\n<p>Between blocks</p>\n"
+            '<section class="proposal-block" id="block_budget_1">Budget</section>\n'
+        )
+        assert proposal_module._remove_section(CONTENT, "block_missing") == CONTENT
+
+    def test_insert_block_at_position(self, service, proposal):
+        """Test a positioned block lands between the chunks the split produced."""
+        content = service.add_block_to_content(proposal.id, "timeline", "<p>Q3</p>", position=1)
+
+        intro = content.index("<h1>Intro</h1>")
+        timeline = content.index(f'id="block_timeline_{proposal.id}"')
+        scope = content.index('id="block_scope_1"')
+        assert intro < timeline < scope
+        assert content.startswith("<style>")
+
+    def test_append_block_without_position(self, service, proposal):
+        """Test a block without a position is appended after the existing content."""
+        content = service.add_block_to_content(proposal.id, "timeline", "<p>Q3</p>")
+
+        assert content.startswith(CONTENT)
+        assert content.rstrip().endswith("</section>")
+        assert content.index(f'id="block_timeline_{proposal.id}"') > content.index('id="block_budget_1"')
+
+    def test_remove_block_creates_version(self, service, proposal):
+        """Test removing a block keeps other markup and records a new current version."""
+        before = _versions(service, proposal.id)
+        content = service.remove_block_from_content(proposal.id, "block_scope_1")
+
+        assert 'id="block_scope_1"' not in content
+        assert "<style>" in content and 'id="block_budget_1"' in content
+        assert _versions(service, proposal.id)[0] == (before[0][0] + 1, True)
+        assert service.get_proposal(proposal.id).content == content
+
+
+class TestDeleteProposal:
+    """Test proposal deletion."""
+
+    def test_delete_removes_proposal_and_children(self, service, proposal, db_session):
+        """Test deleting removes the proposal with its versions, shares and tracker."""
+        service.create_proposal_share(proposal.id, "view", proposal.created_by)
+
+        assert service.delete_proposal(proposal.id) is True
+        db_session.expire_all()
+        assert service.get_proposal(proposal.id) is None
+        assert service.get_proposal_versions(proposal.id) == []
+        assert service.get_project_tracker(proposal.id) is None
+        assert db_session.query(ProposalShare).count() == 0
+
+    def test_delete_missing_keeps_pending_work(self, service, user, db_session, monkeypatch):
+        """Test a missing proposal issues no deletes and leaves the caller's session alone."""
+        statements = []
+        execute = db_session.execute
+
+        def recording_execute(statement, *args, **kwargs):
+            statements.append(statement)
+            return execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db_session, "execute", recording_execute)
+        monkeypatch.setattr(db_session, "rollback", lambda: pytest.fail("session rolled back"))
+        user.first_name = "Pending"
+
+        assert service.delete_proposal(999) is False
+        assert not [stmt for stmt in statements if isinstance(stmt, Delete)]
+        assert user in db_session.dirty
+
+
+class TestHtmlExport:
+    """Test the HTML export document."""
+
+    def test_html_export_wraps_content(self, service, proposal):
+        """Test the export is a whole document with the metadata block before the content."""
+        html = service.export_proposal(proposal.id, "html")
+
+        assert html.startswith("<!DOCTYPE html>\n")
+        assert html.endswith("</body>\n</html>\n")
+        assert "<title>Portal - Acme</title>" in html
+        assert html.index('class="proposal-metadata"') < html.index(CONTENT)
+
+    def test_html_export_without_metadata(self, service, proposal):
+        """Test metadata can be left out of the export."""
+        html = service.export_proposal(proposal.id, "html", include_metadata=False)
+
+        assert "proposal-metadata\"" not in html.split("</head>")[1]
+        assert f"<body>\n{CONTENT}\n</body>" in html
+
+
+class TestExportFilename:
+    """Test export file names built from user-supplied names."""
+
+    def test_unsafe_characters_replaced(self, service, proposal):
+        """Test path separators, quotes and header delimiters do not survive."""
+        proposal.project_name = '../x"; filename=evil.exe'
+        proposal.client_name = "Acme\r\nSet-Cookie: a=b"
+
+        filename = proposal_module.export_filename(proposal, "html")
+
+        assert filename == ".._x_filename_evil.exe_Acme_Set-Cookie_a_b_proposal.html"
+
+    def test_long_names_capped(self, service, proposal):
+        """Test each name is capped before the suffix is added."""
+        proposal.project_name = "p" * 100
+
+        assert proposal_module.export_filename(proposal, "pdf") == f"{'p' * 64}_Acme_proposal.pdf"
+
+
+class TestExportLogging:
+    """Test that exports are recorded in proposal metadata."""
+
+    def test_export_recorded_in_history(self, service, proposal):
+        """Test each export appends a record that complete history returns."""
+        service.export_proposal(proposal.id, "html")
+        service.export_proposal(proposal.id, "html", include_metadata=False)
+
+        exports = service.get_proposal_complete_history(proposal.id)["exports"]
+        assert [record["format"] for record in exports] == ["html", "html"]
+        assert all(record["success"] for record in exports)
+
+    def test_export_record_committed(self, service, proposal):
+        """Test the export record is committed, not left pending on the session."""
+        service.export_proposal(proposal.id, "html")
+
+        with TestingSessionLocal() as other:
+            stored = other.get(Proposal, proposal.id).proposal_metadata
+        assert [record["format"] for record in stored["export_history"]] == ["html"]
+
+    def test_postgresql_append_is_server_side(self):
+        """Test the PostgreSQL statement appends with || instead of rewriting the document."""
+        statement = proposal_module._append_export_history_jsonb(1, [{"format": "html"}])
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert sql.startswith("UPDATE proposals SET metadata=")
+        assert sql.count("||") == 2
+        assert "jsonb_build_object" in sql
+        assert "SELECT" not in sql
+
+
+class TestErrorHandling:
+    """Test the _transactional error mapping and its nesting behaviour."""
+
+    @pytest.fixture
+    def rollbacks(self, db_session, monkeypatch):
+        """Count session rollbacks."""
+        calls = []
+        rollback = db_session.rollback
+
+        def counting_rollback():
+            calls.append(True)
+            rollback()
+
+        monkeypatch.setattr(db_session, "rollback", counting_rollback)
+        return calls
+
+    def _fail_reads(self, db_session, monkeypatch):
+        def unavailable(*args, **kwargs):
+            raise OperationalError("SELECT", {}, Exception("database unavailable"))
+
+        monkeypatch.setattr(db_session, "get", unavailable)
+
+    def test_database_errors_mapped(self, service, proposal, db_session, rollbacks, monkeypatch):
+        """Test operational errors become ProposalDatabaseUnavailableError after a rollback."""
+        self._fail_reads(db_session, monkeypatch)
+
+        with pytest.raises(ProposalDatabaseUnavailableError, match="^Failed to retrieve proposal: "):
+            service.get_proposal(proposal.id)
+        assert len(rollbacks) == 1
+
+    def test_nested_failure_handled_once_by_outer_method(self, service, user, proposal, db_session, rollbacks, monkeypatch):
+        """Test a failing read inside another method is rolled back and wrapped only once."""
+        self._fail_reads(db_session, monkeypatch)
+
+        with pytest.raises(ProposalDatabaseUnavailableError) as error:
+            service.duplicate_proposal(proposal.id, "Copy", "Acme", user.id)
+
+        assert str(error.value).startswith("Failed to duplicate proposal: ")
+        assert "Failed to retrieve proposal" not in str(error.value)
+        assert len(rollbacks) == 1
+
+    def test_service_errors_pass_through(self, service, rollbacks):
+        """Test service errors keep their type and message."""
+        with pytest.raises(ProposalNotFoundError, match="^Proposal 999 not found$"):
+            service.add_block_to_content(999, "timeline", "<p>Q3</p>")
+        with pytest.raises(ProposalServiceError, match="Invalid project phase"):
+            service.create_proposal("Portal", "Acme", "unknown", "/t.txt", 1, "Summary", {})
+        assert len(rollbacks) == 2
+
+    def test_state_reset_after_error(self, service, proposal, db_session, monkeypatch):
+        """Test a failed call does not leave the service treating later calls as nested."""
+        self._fail_reads(db_session, monkeypatch)
+        with pytest.raises(ProposalDatabaseUnavailableError):
+            service.get_proposal(proposal.id)
+
+        monkeypatch.undo()
+        assert service._in_transaction is False
+        assert service.get_proposal(proposal.id).id == proposal.id